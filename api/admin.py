@@ -0,0 +1,84 @@
+"""
+Admin endpoints, mounted at /api/admin
+Served by their own app, imported on first use (see lazy.py), so the admin
+code stays off the cold-start path of the public API.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import FastAPI, Depends, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import get_read_db, new_read_session
+from .archive import stream_archive
+from .models import User, Product, DealStats
+from .counters import admin_stats_cache
+from .pagination import paginate, split_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .metrics import render_metrics
+from .auth import TokenUser, require_admin
+from .schemas import Page, AdminUserOut, AdminStatsOut
+
+app = FastAPI(title="CarX Mods Club API - admin", default_response_class=ORJSONResponse)
+
+@app.get("/stats", response_model=AdminStatsOut)
+async def get_admin_stats(admin: TokenUser = Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    """Get admin statistics"""
+    stats = admin_stats_cache.get("stats")
+    if stats is not None:
+        return stats
+    
+    # Deal totals come precomputed from deal_stats (one row per status)
+    result = await db.execute(
+        select(
+            select(func.count(User.id)).scalar_subquery(),
+            select(func.count(Product.id)).scalar_subquery(),
+        )
+    )
+    total_users, total_products = result.one()
+    by_status = {row.status: row for row in (await db.execute(select(DealStats))).scalars()}
+    completed = by_status.get("completed")
+    
+    stats = {
+        "total_users": total_users,
+        "total_products": total_products,
+        "completed_deals": completed.deal_count if completed else 0,
+        "total_revenue": float(completed.revenue) if completed else 0.0,
+        "deals_by_status": {status: row.deal_count for status, row in by_status.items()}
+    }
+    admin_stats_cache.set("stats", stats)
+    return stats
+
+@app.get("/users", response_model=Page[AdminUserOut])
+async def get_all_users(
+    admin: TokenUser = Depends(require_admin),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get users for admin panel, newest first"""
+    query = paginate(select(User), User.created_at, User.id, cursor, limit, descending=True)
+    result = await db.execute(query)
+    users, next_cursor = split_page(result.scalars().all(), limit)
+    
+    return {"items": users, "next_cursor": next_cursor}
+
+@app.get("/messages/archive")
+async def export_message_archive(admin: TokenUser = Depends(require_admin), archived_after: Optional[datetime] = None):
+    """Stream the archived chat histories (see archive.py) as NDJSON, deal by deal"""
+    async def lines():
+        async with new_read_session() as db:
+            async for chunk in stream_archive(db, archived_after):
+                yield chunk
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="message-archive.ndjson"'}
+    )
+
+@app.get("/metrics")
+async def get_metrics(admin: TokenUser = Depends(require_admin)):
+    """Per-route request, DB time and statement histograms (Prometheus text format)"""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,178 @@
+"""
+Message archive
+Chats of deals completed more than ARCHIVE_AFTER_DAYS ago are moved out of
+the messages table into message_archive: one row per deal holding the whole
+history as gzip-compressed NDJSON (one MessageOut object per line). The hot
+messages table and its (deal_id, created_at, id) index then only cover deals
+that are still being talked about.
+
+Archived histories are read back through the streaming export endpoints,
+which decompress one blob at a time in small chunks.
+
+Run: DATABASE_URL="your_neon_url" python -m api.archive [--days 90] [--batch-size 100]
+(e.g. nightly from cron; it also creates the coming months' message
+partitions, see partitions.py)
+"""
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, delete, literal
+
+from .database import new_session, get_engine
+from .models import Deal, Message, MessageArchive, deal_messages
+from .pagination import time_key
+from .partitions import ensure_partitions
+from .schemas import MessageOut
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "100"))
+CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger("api.archive")
+
+
+def encode_history(messages) -> bytes:
+    """gzip NDJSON of the given Message rows, in the order given"""
+    lines = b"".join(MessageOut.model_validate(message).model_dump_json().encode() + b"\n" for message in messages)
+    return gzip.compress(lines)
+
+
+def iter_history(data: bytes, chunk_size: int = CHUNK_SIZE):
+    """Decompress an archive blob incrementally, yielding NDJSON chunks"""
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        chunk = decompressor.decompress(view[start:start + chunk_size])
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+async def archive_deal(db, deal_id: int):
+    """Move one deal's messages into message_archive; returns how many were moved"""
+    result = await db.execute(deal_messages(deal_id).order_by(Message.created_at, Message.id))
+    messages = result.scalars().all()
+    if messages:
+        db.add(MessageArchive(
+            deal_id=deal_id,
+            message_count=len(messages),
+            first_message_at=messages[0].created_at,
+            last_message_at=messages[-1].created_at,
+            data=encode_history(messages),
+        ))
+        # The created_at bound lets PostgreSQL skip older partitions; time_key
+        # makes it compare as an instant on SQLite too
+        oldest = literal(messages[0].created_at, Message.created_at.type)
+        await db.execute(
+            delete(Message)
+            .where(
+                Message.deal_id == deal_id,
+                time_key(Message.created_at) >= time_key(oldest),
+                Message.id <= max(message.id for message in messages),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    await db.execute(
+        update(Deal)
+        .where(Deal.id == deal_id)
+        # updated_at is left alone: archiving isn't a change to the deal
+        .values(messages_archived_at=datetime.now(timezone.utc), updated_at=Deal.updated_at)
+    )
+    return len(messages)
+
+
+async def archive_batch(db, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """Archive up to batch_size due deals and commit; returns (deals, messages) archived"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    # The row locks hold back send_message (its counter UPDATE) until the
+    # history is moved, and let several archivers run side by side
+    result = await db.execute(
+        select(Deal.id)
+        .where(
+            Deal.status == "completed",
+            Deal.completed_at < cutoff,
+            Deal.messages_archived_at.is_(None),
+        )
+        .order_by(Deal.completed_at, Deal.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    deal_ids = result.scalars().all()
+
+    moved = 0
+    for deal_id in deal_ids:
+        moved += await archive_deal(db, deal_id)
+    await db.commit()
+    return len(deal_ids), moved
+
+
+async def load_archive(db, deal_id: int):
+    result = await db.execute(select(MessageArchive.data).where(MessageArchive.deal_id == deal_id))
+    return result.scalar_one_or_none()
+
+
+async def stream_deal_history(db, deal_id: int):
+    """NDJSON for one deal: the archived history, then any newer live messages"""
+    data = await load_archive(db, deal_id)
+    if data is not None:
+        for chunk in iter_history(data):
+            yield chunk
+    result = await db.stream(
+        deal_messages(deal_id)
+        .order_by(Message.created_at, Message.id)
+        .execution_options(yield_per=500)
+    )
+    async for message in result.scalars():
+        yield MessageOut.model_validate(message).model_dump_json().encode() + b"\n"
+
+
+async def stream_archive(db, archived_after: datetime = None):
+    """NDJSON of every archived history, by deal; one blob in memory at a time"""
+    query = select(MessageArchive.deal_id).order_by(MessageArchive.deal_id)
+    if archived_after is not None:
+        query = query.where(MessageArchive.archived_at > archived_after)
+    deal_ids = (await db.execute(query)).scalars().all()
+    for deal_id in deal_ids:
+        data = await load_archive(db, deal_id)
+        if data is None:
+            continue
+        for chunk in iter_history(data):
+            yield chunk
+
+
+async def run(older_than_days: int, batch_size: int):
+    deals = messages = 0
+    try:
+        # Nightly is often enough to keep the next months' partitions in place
+        async with get_engine().begin() as conn:
+            await ensure_partitions(conn)
+        while True:
+            async with new_session() as db:
+                archived, moved = await archive_batch(db, older_than_days, batch_size)
+            deals += archived
+            messages += moved
+            if archived < batch_size:
+                break
+    finally:
+        await get_engine().dispose()
+    logger.info("archived %s message(s) from %s deal(s)", messages, deals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move the chats of old completed deals to message_archive")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive deals completed this many days ago")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="deals per transaction")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(run(args.days, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Authentication: password hashing and stateless JWT access tokens
+Argon2 hashing is CPU- and memory-heavy, so it runs in a small dedicated
+thread pool; tokens carry id/username/role so identifying the caller needs
+no database query.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+
+logger = logging.getLogger("api.auth")
+
+JWT_SECRET = os.getenv("JWT_SECRET")
+if not JWT_SECRET:
+    if os.getenv("VERCEL") or os.getenv("ENVIRONMENT") == "production":
+        # Every instance would sign with its own secret and reject the others' tokens
+        raise ValueError(
+            "JWT_SECRET environment variable is not set. "
+            "Please add it in Vercel Environment Variables: "
+            "Settings > Environment Variables > JWT_SECRET"
+        )
+    # Tokens will only validate on this process; fine for local runs only
+    logger.warning("JWT_SECRET is not set, using a random per-process secret")
+    JWT_SECRET = secrets.token_urlsafe(32)
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_EXPIRATION_HOURS = float(os.getenv("JWT_EXPIRATION_HOURS", "24"))
+
+# Each Argon2 hash uses ~64 MB, so the pool size also bounds memory
+_hasher = PasswordHasher()
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("HASH_WORKERS", "4")), thread_name_prefix="hash")
+# Verified when the username doesn't exist, so both paths cost the same;
+# created on first use to keep it off the import path
+_dummy_hash = None
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+class TokenUser(BaseModel):
+    """Caller identity taken from the access token claims"""
+    id: int
+    username: str
+    role: str
+
+
+def hash_password_sync(password: str) -> str:
+    return _hasher.hash(password)
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _hasher.hash, password)
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith("$argon2")
+
+
+def _verify(password: str, stored: Optional[str]) -> bool:
+    global _dummy_hash
+    if stored is None:
+        if _dummy_hash is None:
+            _dummy_hash = _hasher.hash(secrets.token_urlsafe(16))
+        stored = _dummy_hash
+    elif not is_hashed(stored):
+        # Legacy plaintext row; login rehashes it on success
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        return _hasher.verify(stored, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+async def verify_password(password: str, stored: Optional[str]) -> bool:
+    """Check a password against a stored hash (None: unknown user, still hashed)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _verify, password, stored)
+
+
+def needs_rehash(stored: str) -> bool:
+    return not is_hashed(stored) or _hasher.check_needs_rehash(stored)
+
+
+def create_access_token(user) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": str(user.id),
+        "username": user.username,
+        "role": user.role,
+        "iat": now,
+        "exp": now + timedelta(hours=JWT_EXPIRATION_HOURS),
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def decode_access_token(token: str) -> TokenUser:
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        return TokenUser(id=int(claims["sub"]), username=claims["username"], role=claims["role"])
+    except (jwt.PyJWTError, KeyError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
+async def current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> TokenUser:
+    """Dependency: the authenticated caller, from the token alone"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return decode_access_token(credentials.credentials)
+
+
+async def require_admin(user: TokenUser = Depends(current_user)) -> TokenUser:
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
@@ -0,0 +1,182 @@
+"""
+Bulk product import/export helpers
+Imports are parsed incrementally from the request body and written in
+batches: asyncpg COPY on PostgreSQL, multi-row INSERT elsewhere.
+"""
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+from .models import Product, User
+
+IMPORT_COLUMNS = ["title", "description", "price", "category", "seller", "image_url"]
+EXPORT_COLUMNS = ["id", "title", "description", "price", "category", "seller", "seller_id", "image_url", "created_at"]
+DEFAULT_IMAGE_URL = "https://via.placeholder.com/300x200"
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+async def iter_lines(chunks):
+    """Split a byte stream into lines (newline kept), chunk by chunk
+
+    Yields (text, valid): lines that aren't valid UTF-8 are decoded with
+    replacement characters and valid=False, so callers can report them
+    while CSV quoting still lines up.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield decode_line(line + b"\n")
+    if buffer:
+        yield decode_line(buffer)
+
+
+def decode_line(line: bytes):
+    try:
+        return line.decode("utf-8"), True
+    except UnicodeDecodeError:
+        return line.decode("utf-8", errors="replace"), False
+
+
+async def iter_records(chunks, fmt: str):
+    """Yield (line number, dict) for each CSV row or NDJSON object
+
+    CSV records may span lines when a quoted field contains newlines; lines
+    are joined until the quotes balance. Unparseable records (invalid
+    UTF-8, malformed JSON, JSON that isn't an object) yield an Exception
+    instead of a dict.
+    """
+    header = None
+    pending, start, pending_valid = "", 0, True
+    lineno = 0
+    async for line, valid in iter_lines(chunks):
+        lineno += 1
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            if not valid:
+                yield lineno, ValueError("Invalid UTF-8")
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield lineno, e
+                continue
+            if not isinstance(record, dict):
+                yield lineno, ValueError(f"Expected a JSON object, got {type(record).__name__}")
+                continue
+            yield lineno, record
+            continue
+
+        if not pending:
+            start, pending_valid = lineno, True
+        pending += line
+        pending_valid = pending_valid and valid
+        if pending.count('"') % 2:
+            continue  # inside a quoted field
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        row = next(csv.reader(io.StringIO(record)))
+        if header is None:
+            header = [name.strip() for name in row]
+            if not pending_valid:
+                yield start, ValueError("Invalid UTF-8 in header")
+            continue
+        if not pending_valid:
+            yield start, ValueError("Invalid UTF-8")
+            continue
+        yield start, dict(zip(header, row))
+
+
+async def resolve_seller_ids(db, usernames):
+    result = await db.execute(select(User.username, User.id).where(User.username.in_(usernames)))
+    return dict(result.all())
+
+
+async def write_batch(db, rows):
+    """Insert validated product dicts; COPY on asyncpg, multi-row INSERT otherwise"""
+    seller_ids = await resolve_seller_ids(db, {row["seller"] for row in rows})
+    for row in rows:
+        row["seller_id"] = seller_ids.get(row["seller"])
+
+    if db.bind.dialect.driver == "asyncpg":
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        columns = IMPORT_COLUMNS + ["seller_id"]
+        await raw.driver_connection.copy_records_to_table(
+            Product.__tablename__,
+            records=[tuple(row[c] for c in columns) for row in rows],
+            columns=columns,
+        )
+    else:
+        await db.execute(insert(Product), rows)
+    await db.commit()
+
+
+async def import_products(db, chunks, fmt: str, schema):
+    """Validate records against `schema` and load them in batches"""
+    imported = failed = 0
+    errors = []
+    batch = []
+
+    def error(lineno, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": lineno, "error": message})
+
+    async for lineno, record in iter_records(chunks, fmt):
+        if isinstance(record, Exception):
+            error(lineno, str(record))
+            continue
+        try:
+            product = schema(**{k: v for k, v in record.items() if k in IMPORT_COLUMNS and v not in ("", None)})
+        except (ValidationError, TypeError) as e:
+            error(lineno, str(e))
+            continue
+        row = product.model_dump(include=set(IMPORT_COLUMNS))
+        row["image_url"] = row["image_url"] or DEFAULT_IMAGE_URL
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            await write_batch(db, batch)
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        await write_batch(db, batch)
+        imported += len(batch)
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+def export_row(product, fmt: str) -> str:
+    """One product row (ORM object or Row) as a CSV line or NDJSON object"""
+    values = {
+        "id": product.id,
+        "title": product.title,
+        "description": product.description,
+        "price": product.price,
+        "category": product.category,
+        "seller": product.seller,
+        "seller_id": product.seller_id,
+        "image_url": product.image_url,
+        "created_at": product.created_at.isoformat() if product.created_at else None,
+    }
+    if fmt == "ndjson":
+        return json.dumps(values) + "\n"
+    out = io.StringIO()
+    csv.writer(out).writerow([values[c] if values[c] is not None else "" for c in EXPORT_COLUMNS])
+    return out.getvalue()
+
+
+def export_header(fmt: str) -> str:
+    if fmt == "ndjson":
+        return ""
+    out = io.StringIO()
+    csv.writer(out).writerow(EXPORT_COLUMNS)
+    return out.getvalue()
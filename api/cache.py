@@ -0,0 +1,48 @@
+"""
+In-process caches for read-heavy endpoints
+Each serverless instance / uvicorn worker keeps its own copy, so writes only
+invalidate the instance that handled them; keep TTLs short.
+"""
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Key/value store whose entries expire ttl seconds after being set
+
+    With maxsize set, the least recently used entry is evicted once the
+    cache is full, bounding memory for caches keyed by user input.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,90 @@
+"""
+Denormalized deal counters
+deal_stats holds one row per deal status with its deal count and the summed
+product price; deals.message_count / last_message_at are bumped per message.
+Both are written in the same transaction as the change they describe, so
+inbox views and admin stats read precomputed numbers instead of scanning
+deals and messages.
+"""
+import os
+
+from sqlalchemy import select, update, insert, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .cache import TTLCache
+from .models import Deal, DealStats, Message, Product
+
+# Admin dashboard snapshot, dropped whenever a deal changes status
+admin_stats_cache = TTLCache(ttl=float(os.getenv("ADMIN_STATS_TTL", "30")))
+
+_UPSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+async def bump_deal_stats(db, status: str, deals: int = 1, revenue: float = 0.0):
+    """Add to one status row, creating it on first use"""
+    dialect = db.get_bind().dialect.name
+    if dialect in _UPSERT:
+        stmt = _UPSERT[dialect](DealStats).values(status=status, deal_count=deals, revenue=revenue)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[DealStats.status],
+            set_={
+                "deal_count": DealStats.deal_count + stmt.excluded.deal_count,
+                "revenue": DealStats.revenue + stmt.excluded.revenue,
+            }
+        ))
+        return
+    result = await db.execute(
+        update(DealStats)
+        .where(DealStats.status == status)
+        .values(deal_count=DealStats.deal_count + deals, revenue=DealStats.revenue + revenue)
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(DealStats).values(status=status, deal_count=deals, revenue=revenue))
+
+
+async def move_deal_status(db, old: str, new: str, price: float):
+    """Move one deal of the given product price from `old` to `new`"""
+    if old == new:
+        return
+    # Always touch the rows in the same order so two opposite moves can't deadlock
+    for status, sign in sorted([(old, -1), (new, 1)]):
+        if status is not None:
+            await bump_deal_stats(db, status, sign, sign * (price or 0.0))
+
+
+async def record_message(db, deal_id: int):
+    """Bump a deal's message counters; returns False if the deal doesn't exist
+
+    updated_at is left alone: it tracks changes to the deal itself, chat
+    activity has last_message_at.
+    """
+    result = await db.execute(
+        update(Deal)
+        .where(Deal.id == deal_id)
+        .values(message_count=Deal.message_count + 1, last_message_at=func.now(), updated_at=Deal.updated_at)
+        .returning(Deal.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def rebuild_counters(db):
+    """Recompute every counter from deals and messages (backfill, bulk seeding)"""
+    await db.execute(delete(DealStats))
+    await db.execute(insert(DealStats).from_select(
+        ["status", "deal_count", "revenue"],
+        select(Deal.status, func.count(Deal.id), func.coalesce(func.sum(Product.price), 0.0))
+        .join(Product, Product.id == Deal.product_id)
+        .where(Deal.status.is_not(None))
+        .group_by(Deal.status)
+    ))
+    await db.execute(
+        update(Deal)
+        .values(
+            message_count=select(func.count(Message.id)).where(Message.deal_id == Deal.id).scalar_subquery(),
+            last_message_at=select(func.max(Message.created_at)).where(Message.deal_id == Deal.id).scalar_subquery(),
+            # Not a change to the deals; keeps Deal.updated_at's onupdate out of the UPDATE
+            updated_at=Deal.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
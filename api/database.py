@@ -1,47 +1,152 @@
 import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import Request, Response
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
 
-# Get DATABASE_URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
+def database_url() -> str:
+    """DATABASE_URL from the environment, rewritten for the asyncpg driver"""
+    url = os.getenv("DATABASE_URL")
+    
+    if not url:
+        raise ValueError(
+            "DATABASE_URL environment variable is not set. "
+            "Please add it in Vercel Environment Variables: "
+            "Settings > Environment Variables > DATABASE_URL"
+        )
+    return asyncpg_url(url)
 
-if not DATABASE_URL:
-    raise ValueError(
-        "DATABASE_URL environment variable is not set. "
-        "Please add it in Vercel Environment Variables: "
-        "Settings > Environment Variables > DATABASE_URL"
+def replica_url():
+    """DATABASE_REPLICA_URL (optional read replica), rewritten like DATABASE_URL"""
+    url = os.getenv("DATABASE_REPLICA_URL")
+    return asyncpg_url(url) if url else None
+
+def asyncpg_url(url: str) -> str:
+    # Ensure we use asyncpg driver
+    # Convert postgres:// or postgresql:// to postgresql+asyncpg://
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql+asyncpg://", 1)
+    elif url.startswith("postgresql://") and "+asyncpg" not in url:
+        url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
+    # Remove sslmode parameter from URL (asyncpg doesn't support it in URL)
+    if "?sslmode=" in url:
+        url = url.split("?")[0]
+    
+    return url
+
+# Deployment mode:
+#   serverless (default, and always on Vercel) - NullPool, a fresh connection
+#       per request; pooled connections would outlive the function's event loop
+#   pooled - long-running uvicorn workers (Procfile); connections are reused
+DB_POOL_MODE = "serverless" if os.getenv("VERCEL") else os.getenv("DB_POOL_MODE", "serverless")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+
+def pool_capacity():
+    """Connections one engine can hand out at once; None when unpooled"""
+    return DB_POOL_SIZE + DB_MAX_OVERFLOW if DB_POOL_MODE == "pooled" else None
+
+def create_engine_for_mode(url: str, mode: str = DB_POOL_MODE):
+    """Build the async engine for the given deployment mode"""
+    if mode not in ("serverless", "pooled"):
+        raise ValueError(f"Unknown DB_POOL_MODE: {mode!r} (expected 'serverless' or 'pooled')")
+    
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg://"):
+        connect_args["ssl"] = "require"  # SSL mode for asyncpg
+    
+    if mode == "serverless":
+        return create_async_engine(
+            url,
+            echo=False,
+            poolclass=NullPool,  # Critical for serverless - prevents event loop conflicts
+            connect_args=connect_args
+        )
+    
+    # asyncpg prepared statement cache; keep at 0 behind PgBouncer in
+    # transaction mode (e.g. Neon "-pooler" hosts), which can't track them
+    statement_cache_size = os.getenv("DB_STATEMENT_CACHE_SIZE")
+    if statement_cache_size is not None and url.startswith("postgresql+asyncpg://"):
+        connect_args["statement_cache_size"] = int(statement_cache_size)
+        connect_args["prepared_statement_cache_size"] = int(statement_cache_size)
+    
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "300")),  # below Neon's idle timeout
+        pool_pre_ping=True,
+        connect_args=connect_args
     )
 
-# Ensure we use asyncpg driver
-# Convert postgres:// or postgresql:// to postgresql+asyncpg://
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL.startswith("postgresql://") and "+asyncpg" not in DATABASE_URL:
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
-
-# Remove sslmode parameter from URL (asyncpg doesn't support it in URL)
-if "?sslmode=" in DATABASE_URL:
-    DATABASE_URL = DATABASE_URL.split("?")[0]
-
-# Create async engine with NullPool for serverless
-# NullPool = no connection reuse, each request gets fresh connection
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    poolclass=NullPool,  # Critical for serverless - prevents event loop conflicts
-    connect_args={"ssl": "require"}  # SSL mode for asyncpg
-)
-
-# Session maker
-async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# The engine (and the driver import it pulls in) is built on first use rather
+# than at import, so a cold start only pays for it when a request hits the DB
+_engine = None
+_session_maker = None
+_replica_engine = None
+_replica_session_maker = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine_for_mode(database_url())
+    return _engine
+
+def get_session_maker():
+    global _session_maker
+    if _session_maker is None:
+        _session_maker = async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+    return _session_maker
+
+def new_session() -> AsyncSession:
+    return get_session_maker()()
+
+def get_replica_engine():
+    """The read replica's engine, or the primary's when no replica is configured"""
+    global _replica_engine
+    if _replica_engine is None:
+        url = replica_url()
+        _replica_engine = create_engine_for_mode(url) if url else get_engine()
+    return _replica_engine
+
+def new_read_session() -> AsyncSession:
+    global _replica_session_maker
+    if _replica_session_maker is None:
+        _replica_session_maker = async_sessionmaker(get_replica_engine(), class_=AsyncSession, expire_on_commit=False)
+    return _replica_session_maker()
+
+def __getattr__(name):
+    # `from .database import engine` keeps working for scripts and benchmarks
+    if name == "engine":
+        return get_engine()
+    if name == "async_session_maker":
+        return get_session_maker()
+    if name == "DATABASE_URL":
+        return database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Base for models
 Base = declarative_base()
 
-# Dependency
-async def get_db():
-    async with async_session_maker() as session:
+# Read-your-writes: a client that just wrote keeps reading from the primary
+# for this long, covering the replica's replication lag
+REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+@asynccontextmanager
+async def session_scope(make_session):
+    """Session committed on success, rolled back on error; holds a db_admission slot"""
+    # Imported here so scripts can still import database.py on its own
+    from .ratelimit import db_admission
+    
+    async with db_admission.slot(), make_session() as session:
         try:
             yield session
             await session.commit()
@@ -50,3 +155,29 @@ async def get_db():
             raise
         finally:
             await session.close()
+
+# Dependency for routes that write; goes to the primary
+async def get_db(request: Request, response: Response):
+    if request.method not in SAFE_METHODS:
+        # Set before the write: a failed write only costs a few primary reads
+        response.set_cookie(
+            STICKY_COOKIE, str(int(time.time() + REPLICA_STICKY_SECONDS) + 1),
+            max_age=int(REPLICA_STICKY_SECONDS) + 1, httponly=True, samesite="lax"
+        )
+    async with session_scope(new_session) as session:
+        yield session
+
+def reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_session(request: Request):
+    """session_scope() for a read: the replica unless the client wrote recently"""
+    return session_scope(new_session if reads_from_primary(request) else new_read_session)
+
+# Dependency for read-only routes
+async def get_read_db(request: Request):
+    async with read_session(request) as session:
+        yield session
@@ -0,0 +1,87 @@
+"""
+Image processing for uploads: content hashing and resized variants
+Resizing is CPU-bound, so it runs in a small thread pool (Pillow releases the
+GIL while decoding and resampling) instead of on the event loop.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Variant name -> bounding box; images are only ever scaled down
+VARIANTS = {
+    "thumbnail": (160, 160),
+    "card": (480, 360),
+    "full": (1600, 1600),
+}
+
+# Formats Pillow can decode; others (SVG, ICO) are stored as uploaded
+RESIZABLE_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"}
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# Decoded size cap: a small, highly compressible upload can otherwise expand
+# to gigabytes (Pillow only refuses past ~179M pixels). 25M px is ~100 MB RGBA
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "25000000"))
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+
+# Uploads up to this size stay in memory while hashing; larger ones spill to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+async def spool_and_hash(chunks):
+    """Copy an async chunk stream into a temporary file, hashing as it goes
+
+    Returns (sha256 hex digest, file rewound to the start).
+    """
+    digest = hashlib.sha256()
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        async for chunk in chunks:
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return digest.hexdigest(), spool
+
+
+def _render_variants(data: bytes) -> dict:
+    """{format: {variant: encoded bytes}} for WebP, plus AVIF when supported
+
+    Raises ValueError for images over MAX_IMAGE_PIXELS, checked from the
+    header before any pixel data is decoded.
+    """
+    from PIL import Image, ImageOps
+
+    Image.init()
+    formats = ["webp"]
+    if "AVIF" in Image.SAVE:  # Pillow 11.2+ or pillow-avif-plugin
+        formats.append("avif")
+
+    with Image.open(io.BytesIO(data)) as source:
+        width, height = source.size
+        if width * height > MAX_IMAGE_PIXELS:
+            raise ValueError(f"{width}x{height} pixels is over the {MAX_IMAGE_PIXELS} pixel limit")
+        # Largest first, each shrunk from the previous one rather than from the source
+        variants = sorted(VARIANTS.items(), key=lambda item: item[1][0] * item[1][1], reverse=True)
+        # JPEGs decode straight at a reduced scale when that still covers the largest box
+        source.draft("RGB", variants[0][1])
+        ImageOps.exif_transpose(source, in_place=True)
+        image = source if source.mode in ("RGB", "RGBA") else source.convert("RGBA")
+
+        rendered = {fmt: {} for fmt in formats}
+        for name, box in variants:
+            image.thumbnail(box, Image.LANCZOS)
+            for fmt in formats:
+                out = io.BytesIO()
+                image.save(out, format=fmt.upper(), quality=80)
+                rendered[fmt][name] = out.getvalue()
+        return rendered
+
+
+async def render_variants(data: bytes) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _render_variants, data)
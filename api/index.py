@@ -1,27 +1,59 @@
 """
 Vercel serverless function entry point with PostgreSQL database
 """
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert, func, tuple_
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 import os
+import re
+import asyncio
+import hashlib
+import time
 import base64
-import httpx
-
-from .database import get_db, engine, Base
-from .models import User, Product, Deal, Message
+import orjson
+
+from .database import get_db, get_read_db, read_session, get_engine, new_session, new_read_session
+from . import migrations
+from .models import User, Product, Deal, Message, ImageAsset, SEARCH_CONFIG, product_search_vector, deal_messages
+from .counters import bump_deal_stats, record_message, admin_stats_cache
+from .transitions import transition_deal
+from .outbox import enqueue
+from .archive import stream_deal_history
+from .cache import TTLCache
+from .pagination import paginate, split_page, encode_rank_cursor, decode_rank_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .realtime import deal_hub
+from .storage import close_http_client
+from .metrics import MetricsMiddleware, instrument_engine
+from .bulk import import_products, export_header, export_row
+from .ratelimit import rate_limit, db_admission
+from .lazy import LazyApp
+from .schemas import (
+    Page, UserOut, AuthOut, ProductOut, DealOut, DealSummaryOut, DealDetailOut, MessageOut
+)
+from .auth import (
+    TokenUser, current_user, require_admin, create_access_token, decode_access_token,
+    hash_password, verify_password, needs_rehash
+)
 
 app = FastAPI(
     title="CarX Mods Club API",
     description="Trading platform for game mods with PostgreSQL",
-    version="3.0.0"
+    version="3.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Per-request SQL statement counts and timings (Server-Timing, logs, /api/admin/metrics);
+# listens on the Engine class because the engine itself is only built on first use
+instrument_engine(Engine)
+app.add_middleware(MetricsMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,11 +79,13 @@ class CreateDealRequest(BaseModel):
 
 class UpdateDealStatusRequest(BaseModel):
     status: str
+    expected_status: Optional[str] = None  # the status the client last saw
+    version: Optional[int] = None
     steam_card_code: Optional[str] = None
 
 class SendMessageRequest(BaseModel):
     message: str
-    sender_id: int
+    sender_id: Optional[int] = None  # ignored; the sender is the authenticated user
 
 class ProductCreate(BaseModel):
     title: str
@@ -69,8 +103,47 @@ class ProductUpdate(BaseModel):
     seller: Optional[str] = None
     image_url: Optional[str] = None
 
-# Note: Tables should be initialized using init_db.py
-# Run: DATABASE_URL="your_neon_url" python api/init_db.py
+# Long-poll on GET /messages: max hold time, and how often to re-check the DB
+# for messages committed by other instances the in-process hub can't see
+LONG_POLL_MAX_WAIT = float(os.getenv("LONG_POLL_MAX_WAIT", "25"))
+LONG_POLL_RECHECK = float(os.getenv("LONG_POLL_RECHECK", "2"))
+
+# Catalogue reads (products, product detail, categories), keyed by endpoint and
+# query; cleared by product writes. Browsers and the edge revalidate with ETag.
+catalogue_cache = TTLCache(
+    ttl=float(os.getenv("CATALOGUE_CACHE_TTL", "30")),
+    maxsize=int(os.getenv("CATALOGUE_CACHE_SIZE", "512"))
+)
+CATALOGUE_CACHE_CONTROL = "public, max-age=0, s-maxage=30, stale-while-revalidate=60"
+
+async def catalogue_response(request: Request, key, load):
+    """Serve a catalogue read from catalogue_cache with ETag / Cache-Control
+
+    load() returns a response model or plain JSON data; either is serialized
+    once, on a cache miss.
+    """
+    entry = catalogue_cache.get(key)
+    if entry is None:
+        data = await load()
+        body = data.model_dump_json().encode() if isinstance(data, BaseModel) else orjson.dumps(data)
+        entry = ('"' + hashlib.sha1(body).hexdigest()[:20] + '"', body)
+        catalogue_cache.set(key, entry)
+    
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": CATALOGUE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Resolved user profiles by id; identity itself comes from the token
+user_cache = TTLCache(ttl=float(os.getenv("USER_CACHE_TTL", "300")), maxsize=10000)
+
+# Note: Schema changes are applied with versioned migrations (api/migrations)
+# Run: DATABASE_URL="your_neon_url" python api/migrate.py
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_client()
 
 # Routes
 @app.get("/")
@@ -90,24 +163,27 @@ async def init_database(secret: str = "", db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=403, detail="Forbidden: Invalid secret token")
     
     try:
-        # Create tables
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+        # Apply pending migrations
+        await migrations.upgrade(get_engine())
+        
+        existing = await db.execute(select(User.id).limit(1))
+        if existing.first():
+            return {"success": True, "message": "Schema migrated; data already present"}
         
         # Add seed data
         # Users
-        admin = User(username="admin", email="admin@example.com", role="admin", password="admin123")
-        seller = User(username="seller", email="seller@example.com", role="seller", password="seller123")
+        admin = User(username="admin", email="admin@example.com", role="admin", password=await hash_password("admin123"))
+        seller = User(username="seller", email="seller@example.com", role="seller", password=await hash_password("seller123"))
         db.add_all([admin, seller])
         await db.commit()
         
         # Products (all from seller user)
         products = [
-            Product(title="BMW M3 E46 Mod", description="High quality BMW M3 E46 mod", price=9.99, category="Cars", seller="seller", image_url="https://via.placeholder.com/300x200"),
-            Product(title="Custom Sound Pack", description="Realistic engine sounds pack", price=4.99, category="Audio", seller="seller", image_url="https://via.placeholder.com/300x200"),
-            Product(title="Drift Map Bundle", description="5 amazing drift tracks", price=14.99, category="Maps", seller="seller", image_url="https://via.placeholder.com/300x200"),
-            Product(title="Racing Livery Pack", description="Professional racing liveries", price=7.99, category="Liveries", seller="seller", image_url="https://via.placeholder.com/300x200"),
-            Product(title="Turbo Performance Kit", description="Upgrade your car performance", price=12.99, category="Parts", seller="seller", image_url="https://via.placeholder.com/300x200"),
+            Product(title="BMW M3 E46 Mod", description="High quality BMW M3 E46 mod", price=9.99, category="Cars", seller="seller", seller_id=seller.id, image_url="https://via.placeholder.com/300x200"),
+            Product(title="Custom Sound Pack", description="Realistic engine sounds pack", price=4.99, category="Audio", seller="seller", seller_id=seller.id, image_url="https://via.placeholder.com/300x200"),
+            Product(title="Drift Map Bundle", description="5 amazing drift tracks", price=14.99, category="Maps", seller="seller", seller_id=seller.id, image_url="https://via.placeholder.com/300x200"),
+            Product(title="Racing Livery Pack", description="Professional racing liveries", price=7.99, category="Liveries", seller="seller", seller_id=seller.id, image_url="https://via.placeholder.com/300x200"),
+            Product(title="Turbo Performance Kit", description="Upgrade your car performance", price=12.99, category="Parts", seller="seller", seller_id=seller.id, image_url="https://via.placeholder.com/300x200"),
         ]
         db.add_all(products)
         await db.commit()
@@ -117,28 +193,25 @@ async def init_database(secret: str = "", db: AsyncSession = Depends(get_db)):
         return {"success": False, "error": str(e)}
 
 # Auth
-@app.post("/api/auth/login")
+@app.post("/api/auth/login", response_model=AuthOut)
 async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(User).where(User.username == request.username)
     )
     user = result.scalar_one_or_none()
     
-    if not user or user.password != request.password:
+    # Hash check runs even for unknown usernames so timing doesn't reveal them
+    valid = await verify_password(request.password, user.password if user else None)
+    if not user or not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    return {
-        "access_token": f"token_{user.username}",
-        "token_type": "bearer",
-        "user": {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "role": user.role
-        }
-    }
+    # Upgrade legacy plaintext / outdated hashes; committed by get_db
+    if needs_rehash(user.password):
+        user.password = await hash_password(request.password)
+    
+    return {"access_token": create_access_token(user), "user": user}
 
-@app.post("/api/auth/register")
+@app.post("/api/auth/register", response_model=AuthOut, dependencies=[Depends(rate_limit("register", per_minute=5, burst=5, by="ip"))])
 async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
     # Check if username exists
     result = await db.execute(
@@ -150,7 +223,7 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     # Create user
     new_user = User(
         username=request.username,
-        password=request.password,
+        password=await hash_password(request.password),
         email=request.email or "",
         role="user"
     )
@@ -160,73 +233,139 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     
     return {
         "message": "User registered successfully",
-        "access_token": f"token_{new_user.username}",
-        "user": {
-            "id": new_user.id,
-            "username": new_user.username,
-            "email": new_user.email,
-            "role": new_user.role
-        }
+        "access_token": create_access_token(new_user),
+        "user": new_user
     }
 
 # Products
-@app.get("/api/products")
-async def get_products(
-    category: Optional[str] = None,
-    search: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
-):
+def prefix_tsquery(search: str) -> Optional[str]:
+    """Turn free text into a tsquery string matching every word as a prefix"""
+    words = re.findall(r"\w+", search)
+    return " & ".join(f"{w}:*" for w in words) or None
+
+async def search_products(db, category, search, cursor, limit):
+    """One page of the catalogue, filtered by category and / or search text"""
     query = select(Product)
     
     if category:
         query = query.where(Product.category == category)
     
-    if search:
-        query = query.where(
-            (Product.title.ilike(f"%{search}%")) | (Product.description.ilike(f"%{search}%"))
-        )
+    ts_query = prefix_tsquery(search) if search else None
+    
+    if ts_query and db.bind.dialect.name == "postgresql":
+        # Ranked full-text search served by the GIN index, best matches
+        # first; pages continue from the last row's (rank, id). ts_rank is a
+        # float4, which round-trips exactly through the cursor's float
+        tsq = func.to_tsquery(SEARCH_CONFIG, ts_query)
+        vector = product_search_vector()
+        rank = func.ts_rank(vector, tsq)
+        query = query.add_columns(rank).where(vector.op("@@")(tsq))
+        if cursor:
+            query = query.where(tuple_(rank, Product.id) < tuple_(*decode_rank_cursor(cursor)))
+        query = query.order_by(rank.desc(), Product.id.desc()).limit(limit + 1)
+        rows = (await db.execute(query)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_rank_cursor(rows[-1][1], rows[-1][0].id)
+        products = [product for product, _ in rows]
+    else:
+        if search:
+            query = query.where(
+                (Product.title.ilike(f"%{search}%")) | (Product.description.ilike(f"%{search}%"))
+            )
     
-    result = await db.execute(query)
-    products = result.scalars().all()
-    
-    return [
-        {
-            "id": p.id,
-            "title": p.title,
-            "description": p.description,
-            "price": p.price,
-            "category": p.category,
-            "seller": p.seller,
-            "image_url": p.image_url,
-            "created_at": p.created_at.isoformat() if p.created_at else None
-        }
-        for p in products
-    ]
-
-@app.get("/api/products/{product_id}")
-async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Product).where(Product.id == product_id)
+        query = paginate(query, Product.created_at, Product.id, cursor, limit, descending=True)
+        result = await db.execute(query)
+        products, next_cursor = split_page(result.scalars().all(), limit)
+    
+    return Page[ProductOut](items=products, next_cursor=next_cursor)
+
+@app.get("/api/products", response_model=Page[ProductOut])
+async def get_products(
+    request: Request,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    # The session (and its db_admission slot) is only taken on a cache miss
+    async def load():
+        async with read_session(request) as db:
+            return await search_products(db, category, search, cursor, limit)
+    
+    return await catalogue_response(request, ("products", category, search, cursor, limit), load)
+
+# Bulk import / export (declared before /api/products/{product_id})
+@app.post("/api/products/import")
+async def import_products_bulk(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    admin: TokenUser = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Load products from a streamed CSV (with header row) or NDJSON body"""
+    if format is None:
+        format = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+    
+    result = await import_products(db, request.stream(), format, ProductCreate)
+    catalogue_cache.invalidate()
+    admin_stats_cache.invalidate()
+    return result
+
+@app.get("/api/products/export")
+async def export_products(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    admin: TokenUser = Depends(require_admin)
+):
+    """Stream every product as CSV or NDJSON through a server-side cursor"""
+    async def rows():
+        yield export_header(format)
+        # Own session: it must stay open until the last row has been sent
+        async with new_read_session() as db:
+            result = await db.stream(
+                select(*Product.__table__.columns)
+                .order_by(Product.id)
+                .execution_options(yield_per=1000)
+            )
+            async for product in result:
+                yield export_row(product, format)
+    
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'}
     )
-    product = result.scalar_one_or_none()
+
+@app.get("/api/products/{product_id}", response_model=ProductOut)
+async def get_product(product_id: int, request: Request):
+    async def load():
+        async with read_session(request) as db:
+            result = await db.execute(
+                select(Product).where(Product.id == product_id)
+            )
+            product = result.scalar_one_or_none()
     
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
     
-    return {
-        "id": product.id,
-        "title": product.title,
-        "description": product.description,
-        "price": product.price,
-        "category": product.category,
-        "seller": product.seller,
-        "image_url": product.image_url,
-        "created_at": product.created_at.isoformat() if product.created_at else None
-    }
+        return ProductOut.model_validate(product)
+    
+    return await catalogue_response(request, ("product", product_id), load)
+
+def seller_id_for(username: str):
+    """Seller FK as a scalar subquery, resolved inside the INSERT/UPDATE itself"""
+    return select(User.id).where(User.username == username).scalar_subquery()
+
+def image_variants_for(image_url: str):
+    """Variants of an uploaded image, looked up inside the INSERT/UPDATE itself"""
+    return select(ImageAsset.variants).where(ImageAsset.url == image_url).scalar_subquery()
 
-@app.post("/api/products")
+@app.post("/api/products", response_model=ProductOut)
 async def create_product(
     product_data: ProductCreate,
+    admin: TokenUser = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     new_product = Product(
@@ -235,25 +374,24 @@ async def create_product(
         price=product_data.price,
         category=product_data.category,
         seller=product_data.seller,
-        image_url=product_data.image_url or "https://via.placeholder.com/300x200"
+        seller_id=seller_id_for(product_data.seller),
+        image_url=product_data.image_url or "https://via.placeholder.com/300x200",
+        image_variants=image_variants_for(product_data.image_url) if product_data.image_url else None
     )
     db.add(new_product)
     await db.commit()
     await db.refresh(new_product)
+    catalogue_cache.invalidate()
     
-    return {
-        "id": new_product.id,
-        "title": new_product.title,
-        "description": new_product.description,
-        "price": new_product.price,
-        "category": new_product.category,
-        "seller": new_product.seller,
-        "image_url": new_product.image_url,
-        "created_at": new_product.created_at.isoformat()
-    }
+    return new_product
 
-@app.put("/api/products/{product_id}")
-async def update_product(product_id: int, request: ProductCreate, db: AsyncSession = Depends(get_db)):
+@app.put("/api/products/{product_id}", response_model=ProductOut)
+async def update_product(
+    product_id: int,
+    request: ProductCreate,
+    admin: TokenUser = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
     result = await db.execute(
         select(Product).where(Product.id == product_id)
     )
@@ -268,25 +406,19 @@ async def update_product(product_id: int, request: ProductCreate, db: AsyncSessi
     product.price = request.price
     product.category = request.category
     product.seller = request.seller
+    product.seller_id = seller_id_for(request.seller)
     if request.image_url:
         product.image_url = request.image_url
+        product.image_variants = image_variants_for(request.image_url)
     
     await db.commit()
     await db.refresh(product)
+    catalogue_cache.invalidate()
     
-    return {
-        "id": product.id,
-        "title": product.title,
-        "description": product.description,
-        "price": product.price,
-        "category": product.category,
-        "seller": product.seller,
-        "image_url": product.image_url,
-        "created_at": product.created_at.isoformat()
-    }
+    return product
 
 @app.delete("/api/products/{product_id}")
-async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_product(product_id: int, admin: TokenUser = Depends(require_admin), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(Product).where(Product.id == product_id)
     )
@@ -297,25 +429,25 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(product)
     await db.commit()
+    catalogue_cache.invalidate()
     
     return {"message": "Product deleted"}
 
 # Categories
 @app.get("/api/categories")
-async def get_categories():
-    return ["Cars", "Audio", "Maps", "Liveries", "Parts"]
+async def get_categories(request: Request):
+    async def load():
+        return ["Cars", "Audio", "Maps", "Liveries", "Parts"]
+    
+    return await catalogue_response(request, ("categories",), load)
 
 # Users
-@app.get("/api/users/me")
-async def get_current_user(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == 1))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return {"id": user.id, "username": user.username, "email": user.email, "role": user.role}
-
-@app.get("/api/users/{user_id}")
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def load_user_profile(user_id: int, db: AsyncSession):
+    """Public profile of a user, served from user_cache when possible"""
+    profile = user_cache.get(user_id)
+    if profile is not None:
+        return profile
+    
     result = await db.execute(
         select(User).where(User.id == user_id)
     )
@@ -324,16 +456,25 @@ async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return {
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "role": user.role
-    }
+    profile = UserOut.model_validate(user)
+    user_cache.set(user_id, profile)
+    return profile
+
+@app.get("/api/users/me", response_model=UserOut)
+async def get_current_user(user: TokenUser = Depends(current_user), db: AsyncSession = Depends(get_read_db)):
+    return await load_user_profile(user.id, db)
+
+@app.get("/api/users/{user_id}", response_model=UserOut)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    return await load_user_profile(user_id, db)
 
 # Deals
-@app.post("/api/deals")
-async def create_deal(request: CreateDealRequest, db: AsyncSession = Depends(get_db)):
+@app.post("/api/deals", response_model=DealOut, dependencies=[Depends(rate_limit("create_deal", per_minute=10, burst=5))])
+async def create_deal(
+    request: CreateDealRequest,
+    user: TokenUser = Depends(current_user),
+    db: AsyncSession = Depends(get_db)
+):
     # Get product
     result = await db.execute(
         select(Product).where(Product.id == request.product_id)
@@ -345,181 +486,191 @@ async def create_deal(request: CreateDealRequest, db: AsyncSession = Depends(get
     
     # Create deal
     new_deal = Deal(
-        buyer_id=1,  # Mock user
-        product_id=request.product_id,
+        buyer_id=user.id,
+        product=product,
         status="pending"
     )
     db.add(new_deal)
+    await bump_deal_stats(db, "pending", 1, product.price)
+    await db.flush()
+    enqueue(db, "deal.created", {"deal_id": new_deal.id})
     await db.commit()
-    await db.refresh(new_deal)
+    await db.refresh(new_deal, ["created_at", "updated_at", "completed_at", "message_count", "last_message_at"])
+    admin_stats_cache.invalidate()
     
-    return {
-        "id": new_deal.id,
-        "buyer_id": new_deal.buyer_id,
-        "product_id": new_deal.product_id,
-        "status": new_deal.status,
-        "created_at": new_deal.created_at.isoformat(),
-        "updated_at": new_deal.updated_at.isoformat() if new_deal.updated_at else None,
-        "product": {
-            "id": product.id,
-            "title": product.title,
-            "description": product.description,
-            "price": product.price,
-            "image_url": product.image_url
-        }
-    }
+    return new_deal
 
-@app.get("/api/deals")
-async def get_deals(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Deal))
-    deals = result.scalars().all()
+@app.get("/api/deals", response_model=Page[DealOut])
+async def get_deals(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Single statement: deals JOIN products, no per-deal lookups
+    query = select(Deal).options(joinedload(Deal.product, innerjoin=True))
+    query = paginate(query, Deal.created_at, Deal.id, cursor, limit, descending=True)
+    result = await db.execute(query)
+    deals, next_cursor = split_page(result.scalars().all(), limit)
     
-    deals_with_products = []
-    for deal in deals:
-        # Get product for each deal
-        prod_result = await db.execute(
-            select(Product).where(Product.id == deal.product_id)
-        )
-        product = prod_result.scalar_one_or_none()
-        
-        if product:
-            deals_with_products.append({
-                "id": deal.id,
-                "buyer_id": deal.buyer_id,
-                "product_id": deal.product_id,
-                "status": deal.status,
-                "created_at": deal.created_at.isoformat(),
-                "updated_at": deal.updated_at.isoformat() if deal.updated_at else None,
-                "product": {
-                    "id": product.id,
-                    "title": product.title,
-                    "price": product.price,
-                    "seller": product.seller,
-                    "image_url": product.image_url
-                }
-            })
-    
-    return deals_with_products
-
-@app.get("/api/deals/{deal_id}")
-async def get_deal(deal_id: int, db: AsyncSession = Depends(get_db)):
+    return {"items": deals, "next_cursor": next_cursor}
+
+@app.get("/api/deals/{deal_id}", response_model=DealDetailOut)
+async def get_deal(deal_id: int, db: AsyncSession = Depends(get_read_db)):
+    # One statement: deals LEFT JOIN products, LEFT JOIN users (buyer);
+    # the seller's id is the indexed products.seller_id FK
     result = await db.execute(
-        select(Deal).where(Deal.id == deal_id)
+        select(Deal)
+        .options(joinedload(Deal.product), joinedload(Deal.buyer))
+        .where(Deal.id == deal_id)
     )
     deal = result.scalar_one_or_none()
     
     if not deal:
         raise HTTPException(status_code=404, detail="Deal not found")
     
-    # Get product
-    prod_result = await db.execute(
-        select(Product).where(Product.id == deal.product_id)
-    )
-    product = prod_result.scalar_one_or_none()
-    
-    # Get buyer username
-    buyer_result = await db.execute(
-        select(User).where(User.id == deal.buyer_id)
-    )
-    buyer = buyer_result.scalar_one_or_none()
-    
-    # Get seller id by username
-    seller_id = None
-    if product:
-        seller_result = await db.execute(
-            select(User).where(User.username == product.seller)
-        )
-        seller_user = seller_result.scalar_one_or_none()
-        if seller_user:
-            seller_id = seller_user.id
-    
-    return {
-        "id": deal.id,
-        "buyer_id": deal.buyer_id,
-        "buyer_username": buyer.username if buyer else "Unknown",
-        "product_id": deal.product_id,
-        "status": deal.status,
-        "created_at": deal.created_at.isoformat(),
-        "updated_at": deal.updated_at.isoformat() if deal.updated_at else None,
-        "product": {
-            "id": product.id,
-            "title": product.title,
-            "description": product.description,
-            "price": product.price,
-            "seller": product.seller,
-            "seller_id": seller_id,
-            "image_url": product.image_url
-        } if product else None
-    }
+    return deal
 
-@app.put("/api/deals/{deal_id}/status")
+@app.put("/api/deals/{deal_id}/status", response_model=DealSummaryOut)
 async def update_deal_status(
     deal_id: int,
     request: UpdateDealStatusRequest,
+    user: TokenUser = Depends(current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    """Apply one state machine transition; 409 if the deal moved on meanwhile"""
+    deal, message = await transition_deal(
+        db, deal_id, request.status, user.id, user.role,
+        expected=request.expected_status, version=request.version
+    )
+    messages = [message]
+    if request.steam_card_code:
+        # Into the chat with the transition; only the shop's notification is
+        # left to the worker, and its payload doesn't carry the code
+        await record_message(db, deal_id)
+        result = await db.execute(
+            insert(Message)
+            .values(deal_id=deal_id, sender_id=user.id, message=f"Steam card code: {request.steam_card_code}", is_system=False)
+            .returning(Message)
+        )
+        messages.append(result.scalar_one())
+        enqueue(db, "deal.steam_card_code", {"deal_id": deal_id})
+    await db.commit()
+    admin_stats_cache.invalidate()
+    
+    payload = DealSummaryOut.model_validate(deal).model_dump(mode="json")
+    deal_hub.publish(deal_id, {"type": "deal_update", "deal_id": deal_id, "status": deal.status, "deal": payload})
+    for message in messages:
+        deal_hub.publish(deal_id, {
+            "type": "new_message",
+            "deal_id": deal_id,
+            "message": MessageOut.model_validate(message).model_dump(mode="json")
+        })
+    return payload
+
+async def require_deal_party(db: AsyncSession, deal_id: int, user: TokenUser):
+    """404 unless the deal exists, 403 unless the user is its buyer, its seller or an admin"""
     result = await db.execute(
-        select(Deal).where(Deal.id == deal_id)
+        select(Deal.buyer_id, Product.seller_id)
+        .join(Product, Product.id == Deal.product_id)
+        .where(Deal.id == deal_id)
     )
-    deal = result.scalar_one_or_none()
-    
-    if not deal:
+    parties = result.one_or_none()
+    if parties is None:
         raise HTTPException(status_code=404, detail="Deal not found")
-    
-    # Update status
-    deal.status = request.status
-    
-    if request.status == "completed":
-        deal.completed_at = datetime.utcnow()
-    
-    await db.commit()
-    await db.refresh(deal)
-    
-    return {
-        "id": deal.id,
-        "buyer_id": deal.buyer_id,
-        "product_id": deal.product_id,
-        "status": deal.status,
-        "created_at": deal.created_at.isoformat(),
-        "updated_at": deal.updated_at.isoformat() if deal.updated_at else None
-    }
+    if user.role != "admin" and user.id not in parties:
+        raise HTTPException(status_code=403, detail="Not a party to this deal")
 
-@app.get("/api/deals/{deal_id}/messages")
-async def get_messages(deal_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Message).where(Message.deal_id == deal_id).order_by(Message.created_at)
+@app.get("/api/deals/{deal_id}/messages", response_model=Page[MessageOut])
+async def get_messages(
+    deal_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    since_id: Optional[int] = None,
+    after: Optional[datetime] = None,
+    wait: float = Query(0, ge=0, le=LONG_POLL_MAX_WAIT),
+    user: TokenUser = Depends(current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Chat history, oldest first
+
+    since_id / after return only newer messages. With wait > 0 an empty
+    result is held open until a message arrives or wait seconds pass.
+    """
+    await require_deal_party(db, deal_id, user)
+    query = deal_messages(deal_id)
+    if since_id is not None:
+        query = query.where(Message.id > since_id)
+    if after is not None:
+        query = query.where(Message.created_at > after)
+    query = paginate(query, Message.created_at, Message.id, cursor, limit)
+    
+    deadline = time.monotonic() + wait
+    # Subscribe before the first query so a message committed in between wakes us
+    queue = deal_hub.subscribe(deal_id) if wait else None
+    try:
+        while True:
+            result = await db.execute(query)
+            messages, next_cursor = split_page(result.scalars().all(), limit)
+            remaining = deadline - time.monotonic()
+            if messages or queue is None or remaining <= 0:
+                break
+            await db.commit()  # don't hold the connection while waiting
+            async with db_admission.suspended():
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=min(remaining, LONG_POLL_RECHECK))
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        if queue is not None:
+            deal_hub.unsubscribe(deal_id, queue)
+    
+    # Messages are append-only, so the request plus the last id, row count
+    # and next cursor (a full page gains one once more messages arrive)
+    # identify the response body
+    last_id = messages[-1].id if messages else None
+    etag = '"' + hashlib.sha1(
+        f"{deal_id}:{cursor}:{limit}:{since_id}:{after}:{last_id}:{len(messages)}:{next_cursor}".encode()
+    ).hexdigest()[:20] + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    return {"items": messages, "next_cursor": next_cursor}
+
+@app.get("/api/deals/{deal_id}/messages/export")
+async def export_messages(deal_id: int, user: TokenUser = Depends(current_user), db: AsyncSession = Depends(get_read_db)):
+    """Stream the deal's full chat history as NDJSON, archived part included"""
+    await require_deal_party(db, deal_id, user)
+    
+    async def lines():
+        # Own session: it must stay open until the last line has been sent
+        async with new_read_session() as db:
+            async for chunk in stream_deal_history(db, deal_id):
+                yield chunk
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="deal-{deal_id}-messages.ndjson"'}
     )
-    messages = result.scalars().all()
-    
-    return [
-        {
-            "id": m.id,
-            "deal_id": m.deal_id,
-            "sender_id": m.sender_id,
-            "message": m.message,
-            "is_system": m.is_system,
-            "created_at": m.created_at.isoformat()
-        }
-        for m in messages
-    ]
-
-@app.post("/api/deals/{deal_id}/messages")
+
+@app.post("/api/deals/{deal_id}/messages", response_model=MessageOut, dependencies=[Depends(rate_limit("send_message", per_minute=30, burst=10))])
 async def send_message(
     deal_id: int,
     request: SendMessageRequest,
+    user: TokenUser = Depends(current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    # Check deal exists
-    result = await db.execute(
-        select(Deal).where(Deal.id == deal_id)
-    )
-    if not result.scalar_one_or_none():
+    await require_deal_party(db, deal_id, user)
+    if not await record_message(db, deal_id):
         raise HTTPException(status_code=404, detail="Deal not found")
     
     # Create message
     new_message = Message(
         deal_id=deal_id,
-        sender_id=request.sender_id,
+        sender_id=user.id,
         message=request.message,
         is_system=False
     )
@@ -527,139 +678,62 @@ async def send_message(
     await db.commit()
     await db.refresh(new_message)
     
-    return {
-        "id": new_message.id,
-        "deal_id": new_message.deal_id,
-        "sender_id": new_message.sender_id,
-        "message": new_message.message,
-        "is_system": new_message.is_system,
-        "created_at": new_message.created_at.isoformat()
-    }
+    payload = MessageOut.model_validate(new_message).model_dump(mode="json")
+    deal_hub.publish(deal_id, {"type": "new_message", "deal_id": deal_id, "message": payload})
+    return payload
 
-# Admin endpoints
-@app.get("/api/admin/stats")
-async def get_admin_stats(db: AsyncSession = Depends(get_db)):
-    """Get admin statistics"""
-    # Count users
-    users_count = await db.execute(select(User))
-    total_users = len(users_count.scalars().all())
-    
-    # Count products
-    products_count = await db.execute(select(Product))
-    total_products = len(products_count.scalars().all())
-    
-    # Count completed deals
-    completed_deals_result = await db.execute(
-        select(Deal).where(Deal.status == "completed")
-    )
-    completed_deals = len(completed_deals_result.scalars().all())
-    
-    # Calculate revenue (sum of completed deal products)
-    total_revenue = 0.0
-    deals_result = await db.execute(
-        select(Deal).where(Deal.status == "completed")
-    )
-    for deal in deals_result.scalars():
-        product_result = await db.execute(
-            select(Product).where(Product.id == deal.product_id)
-        )
-        product = product_result.scalar_one_or_none()
-        if product:
-            total_revenue += product.price
-    
-    return {
-        "total_users": total_users,
-        "total_products": total_products,
-        "completed_deals": completed_deals,
-        "total_revenue": total_revenue
-    }
+@app.websocket("/api/deals/{deal_id}/ws")
+async def deal_socket(websocket: WebSocket, deal_id: int):
+    """Push new messages and status changes of one deal as they are committed
 
-@app.get("/api/admin/users")
-async def get_all_users(db: AsyncSession = Depends(get_db)):
-    """Get all users for admin panel"""
-    result = await db.execute(select(User))
-    users = result.scalars().all()
-    
-    return [
-        {
-            "id": u.id,
-            "username": u.username,
-            "email": u.email,
-            "role": u.role,
-            "is_admin": u.role == "admin",
-            "is_banned": False  # Add this field to User model if needed
-        }
-        for u in users
-    ]
-
-# Image Upload
-@app.post("/api/upload/image")
-async def upload_image(file: UploadFile = File(...)):
-    """Upload image to Vercel Blob storage"""
-    print(f"Upload attempt - filename: {file.filename}, content_type: {file.content_type}")
-    
-    # Validate file type - be more lenient
-    allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp", "image/x-icon", "image/vnd.microsoft.icon", "image/svg+xml"]
-    allowed_extensions = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'ico', 'svg']
-    content_type = file.content_type or ""
-    
-    # Check if it's an image by extension if content_type is missing
-    if content_type not in allowed_types:
-        if file.filename:
-            ext = file.filename.lower().split('.')[-1]
-            if ext in allowed_extensions:
-                # Map extension to proper content type
-                type_map = {
-                    'jpg': 'image/jpeg',
-                    'jpeg': 'image/jpeg',
-                    'png': 'image/png',
-                    'gif': 'image/gif',
-                    'webp': 'image/webp',
-                    'ico': 'image/x-icon',
-                    'svg': 'image/svg+xml'
-                }
-                content_type = type_map.get(ext, 'image/jpeg')
-            else:
-                raise HTTPException(status_code=400, detail=f"Invalid file extension: .{ext}. Allowed: JPG, PNG, GIF, WEBP, ICO, SVG")
-        else:
-            raise HTTPException(status_code=400, detail="Invalid file type. Only images allowed")
-    
-    # Check file size (max 5MB)
-    file_content = await file.read()
-    file_size_mb = len(file_content) / (1024 * 1024)
-    print(f"File size: {file_size_mb:.2f}MB")
-    
-    if len(file_content) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail=f"File too large ({file_size_mb:.1f}MB). Max 5MB")
-    
-    # Get Vercel Blob token from environment
-    blob_token = os.getenv("BLOB_READ_WRITE_TOKEN")
-    if not blob_token:
-        raise HTTPException(status_code=500, detail="Blob storage not configured")
-    
+    Browsers can't set headers on a WebSocket, so the token comes as the
+    second subprotocol: new WebSocket(url, ["bearer", token]). Refusals
+    close with 4000 + the HTTP status (4401, 4403, 4404).
+    """
+    protocols = [p.strip() for p in websocket.headers.get("sec-websocket-protocol", "").split(",")]
     try:
-        # Upload to Vercel Blob
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"https://blob.vercel-storage.com/{file.filename}",
-                headers={
-                    "Authorization": f"Bearer {blob_token}",
-                    "x-content-type": content_type
-                },
-                content=file_content,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Upload failed: {response.text}")
-            
-            result = response.json()
-            return {
-                "success": True,
-                "url": result.get("url"),
-                "filename": file.filename
-            }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload error: {str(e)}")
+        if len(protocols) < 2 or protocols[0] != "bearer":
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        user = decode_access_token(protocols[1])
+        # Short-lived session: don't hold a connection for the socket's lifetime
+        async with new_session() as db:
+            await require_deal_party(db, deal_id, user)
+    except HTTPException as exc:
+        await websocket.close(code=4000 + exc.status_code)
+        return
+    
+    await websocket.accept(subprotocol="bearer")
+    queue = deal_hub.subscribe(deal_id)
+    
+    async def push():
+        while True:
+            event = await queue.get()
+            if event is None:  # dropped by the hub as a slow consumer
+                return
+            await websocket.send_json(event)
+    
+    async def listen():
+        # Client frames are only heartbeats; this returns on disconnect
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+    
+    tasks = [asyncio.create_task(push()), asyncio.create_task(listen())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        deal_hub.unsubscribe(deal_id, queue)
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass  # already closed by the client
+
+# Rarely used route groups, imported on their first request
+app.mount("/api/admin", LazyApp(".admin:app", __package__))
+app.mount("/api/upload", LazyApp(".uploads:app", __package__))
 
 # Export app for Vercel (ASGI)
@@ -1,80 +1,188 @@
 """
 Database initialization script
-Run this once to create tables and add initial data
+Applies schema migrations and adds the initial data to an empty database.
+Pass --reset to drop all tables first.
 """
 import asyncio
-from database import engine, Base
-from models import User, Product
-from sqlalchemy import select
+import os
+import random
+import sys
+from sqlalchemy import select, insert, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-async def init_database():
-    # Create all tables
+try:
+    from .database import engine, Base
+    from .models import User, Product, Deal, Message
+    from .auth import hash_password_sync
+    from .counters import rebuild_counters
+    from .partitions import partition_messages, ensure_partitions
+    from .transitions import DEAL_STATUSES
+    from . import migrations
+except ImportError:  # run as a script: python api/init_db.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from api.database import engine, Base
+    from api.models import User, Product, Deal, Message
+    from api.auth import hash_password_sync
+    from api.counters import rebuild_counters
+    from api.partitions import partition_messages, ensure_partitions
+    from api.transitions import DEAL_STATUSES
+    from api import migrations
+
+CATEGORIES = ["Cars", "Audio", "Maps", "Liveries", "Parts"]
+
+async def create_tables(drop: bool = True):
+    """Schema straight from the models, bypassing migrations (benchmarks, tests)"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+        if drop:
+            await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+        # messages is partitioned on PostgreSQL; the models describe the plain table
+        await partition_messages(conn)
+
+async def seed_demo(session: AsyncSession):
+    """Admin/seller accounts and the demo catalogue"""
+    # Add users
+    users = [
+        User(username="admin", email="admin@example.com", role="admin", password=hash_password_sync("admin123")),
+        User(username="seller", email="seller@example.com", role="seller", password=hash_password_sync("seller123"))
+    ]
+    session.add_all(users)
+    await session.commit()
+    print("✓ Users added")
     
-    print("✓ Tables created")
+    # Add products
+    products = [
+        Product(
+            title="BMW M3 E46 Mod",
+            description="High quality BMW M3 E46 mod with custom liveries",
+            price=9.99,
+            category="Cars",
+            seller="ModMaker123",
+            image_url="https://via.placeholder.com/300x200"
+        ),
+        Product(
+            title="Custom Sound Pack",
+            description="Realistic engine sounds pack",
+            price=4.99,
+            category="Audio",
+            seller="SoundPro",
+            image_url="https://via.placeholder.com/300x200"
+        ),
+        Product(
+            title="Drift Map Bundle",
+            description="5 amazing drift tracks",
+            price=14.99,
+            category="Maps",
+            seller="MapMaster",
+            image_url="https://via.placeholder.com/300x200"
+        ),
+        Product(
+            title="Racing Livery Pack",
+            description="Professional racing liveries collection",
+            price=7.99,
+            category="Liveries",
+            seller="DesignPro",
+            image_url="https://via.placeholder.com/300x200"
+        ),
+        Product(
+            title="Turbo Performance Kit",
+            description="Upgrade your car performance",
+            price=12.99,
+            category="Parts",
+            seller="TuningExp",
+            image_url="https://via.placeholder.com/300x200"
+        )
+    ]
+    session.add_all(products)
+    await session.commit()
+    print("✓ Products added")
+
+async def seed_volume(session: AsyncSession, users=1000, products=10000, deals=5000, messages=50000, batch_size=1000, seed=42):
+    """Bulk synthetic data on top of seed_demo, for load testing
+
+    Rows are inserted with multi-row INSERTs in batches; `seed` makes the
+    data set reproducible between runs.
+    """
+    rng = random.Random(seed)
     
-    # Add initial data
-    async with AsyncSession(engine) as session:
-        # Add users
-        users = [
-            User(username="admin", email="admin@example.com", role="admin", password="admin123"),
-            User(username="seller", email="seller@example.com", role="seller", password="seller123")
-        ]
-        session.add_all(users)
-        await session.commit()
-        print("✓ Users added")
-        
-        # Add products
-        products = [
-            Product(
-                title="BMW M3 E46 Mod",
-                description="High quality BMW M3 E46 mod with custom liveries",
-                price=9.99,
-                category="Cars",
-                seller="ModMaker123",
-                image_url="https://via.placeholder.com/300x200"
-            ),
-            Product(
-                title="Custom Sound Pack",
-                description="Realistic engine sounds pack",
-                price=4.99,
-                category="Audio",
-                seller="SoundPro",
-                image_url="https://via.placeholder.com/300x200"
-            ),
-            Product(
-                title="Drift Map Bundle",
-                description="5 amazing drift tracks",
-                price=14.99,
-                category="Maps",
-                seller="MapMaster",
-                image_url="https://via.placeholder.com/300x200"
-            ),
-            Product(
-                title="Racing Livery Pack",
-                description="Professional racing liveries collection",
-                price=7.99,
-                category="Liveries",
-                seller="DesignPro",
-                image_url="https://via.placeholder.com/300x200"
-            ),
-            Product(
-                title="Turbo Performance Kit",
-                description="Upgrade your car performance",
-                price=12.99,
-                category="Parts",
-                seller="TuningExp",
-                image_url="https://via.placeholder.com/300x200"
-            )
-        ]
-        session.add_all(products)
+    async def bulk(model, rows):
+        for start in range(0, len(rows), batch_size):
+            await session.execute(insert(model), rows[start:start + batch_size])
         await session.commit()
-        print("✓ Products added")
+    
+    # One hash shared by every synthetic user; hashing each would take minutes
+    password = hash_password_sync("password")
+    await bulk(User, [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password": password, "role": "seller" if i % 20 == 0 else "user"}
+        for i in range(users)
+    ])
+    user_ids = (await session.execute(select(User.id))).scalars().all()
+    sellers = (await session.execute(select(User.id, User.username).where(User.role == "seller"))).all()
+    print(f"✓ {users} users added")
+    
+    words = ["drift", "turbo", "street", "racing", "classic", "custom", "pro", "retro", "night", "track"]
+    product_rows = []
+    for i in range(products):
+        seller_id, seller_name = rng.choice(sellers)
+        category = rng.choice(CATEGORIES)
+        title = f"{rng.choice(words).title()} {rng.choice(words)} {category[:-1]} #{i}"
+        product_rows.append({
+            "title": title,
+            "description": " ".join(rng.choice(words) for _ in range(20)),
+            "price": round(rng.uniform(0.99, 49.99), 2),
+            "category": category,
+            "seller": seller_name,
+            "seller_id": seller_id,
+            "image_url": "https://via.placeholder.com/300x200"
+        })
+    await bulk(Product, product_rows)
+    product_ids = (await session.execute(select(Product.id))).scalars().all()
+    print(f"✓ {products} products added")
+    
+    await bulk(Deal, [
+        {"buyer_id": rng.choice(user_ids), "product_id": rng.choice(product_ids), "status": rng.choice(DEAL_STATUSES)}
+        for _ in range(deals)
+    ])
+    deal_rows = (await session.execute(select(Deal.id, Deal.buyer_id))).all()
+    print(f"✓ {deals} deals added")
+    
+    message_rows = []
+    for _ in range(messages):
+        deal_id, buyer_id = rng.choice(deal_rows)
+        message_rows.append({
+            "deal_id": deal_id,
+            "sender_id": buyer_id if rng.random() < 0.5 else rng.choice(user_ids),
+            "message": " ".join(rng.choice(words) for _ in range(rng.randint(1, 15))),
+            "is_system": False
+        })
+    await bulk(Message, message_rows)
+    print(f"✓ {messages} messages added")
+    
+    # Bulk inserts bypass the per-write counter updates
+    await rebuild_counters(session)
+    await session.commit()
+    print("✓ Deal counters rebuilt")
+
+async def init_database(reset: bool = False):
+    if reset:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+        print("✓ Tables dropped")
+    
+    await migrations.upgrade(engine)
+    async with engine.begin() as conn:
+        await ensure_partitions(conn)
+    print("✓ Schema up to date")
+    
+    # Add initial data, only into an empty database
+    async with AsyncSession(engine) as session:
+        if (await session.execute(select(User.id).limit(1))).first():
+            print("✓ Data already present, skipping seed")
+        else:
+            await seed_demo(session)
     
     print("✅ Database initialized successfully!")
 
 if __name__ == "__main__":
-    asyncio.run(init_database())
+    asyncio.run(init_database(reset="--reset" in sys.argv))
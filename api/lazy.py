@@ -0,0 +1,26 @@
+"""
+Lazily imported sub-applications
+Vercel runs the whole API as one function, so every module index.py imports
+is paid for on each cold start. Rarely used route groups (admin, uploads) live
+in their own FastAPI apps mounted through LazyApp, which imports the module on
+the first request under its prefix.
+"""
+import importlib
+
+
+class LazyApp:
+    """ASGI app that resolves "module:attribute" on first call"""
+
+    def __init__(self, target: str, package: str = None):
+        self.target = target
+        self.package = package
+        self._app = None
+
+    def load(self):
+        if self._app is None:
+            module, attribute = self.target.split(":")
+            self._app = getattr(importlib.import_module(module, self.package), attribute)
+        return self._app
+
+    async def __call__(self, scope, receive, send):
+        await self.load()(scope, receive, send)
@@ -0,0 +1,143 @@
+"""
+Per-request database instrumentation
+SQL statements executed while a request is being handled are counted and
+timed via SQLAlchemy engine events. Each response gets a Server-Timing header
+and a structured log line, and per-route histograms are kept for
+/api/admin/metrics in the Prometheus text format. Metrics are per process.
+"""
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger("api.requests")
+
+# Upper bounds (seconds / statements) of the histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Attach statement counting/timing listeners to an (async) engine, or to
+    the Engine class to cover every engine, including ones built later"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += time.perf_counter() - started
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label set"""
+
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0, 0])
+
+    def observe(self, labels: tuple, value: float):
+        counts, _, _ = series = self._series[labels]
+        counts[bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self, label_names) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            label_str = ",".join(f'{k}="{v}"' for k, v in zip(label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_str},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_str}}} {total}")
+            lines.append(f"{self.name}_count{{{label_str}}} {count}")
+        return lines
+
+
+LABELS = ("method", "route", "status")
+request_duration = Histogram("http_request_duration_seconds", "Total request handling time", DURATION_BUCKETS)
+db_duration = Histogram("http_request_db_duration_seconds", "Time spent executing SQL per request", DURATION_BUCKETS)
+db_statements = Histogram("http_request_db_statements", "SQL statements executed per request", STATEMENT_BUCKETS)
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in (request_duration, db_duration, db_statements):
+        lines.extend(histogram.render(LABELS))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: Server-Timing header, request log and histograms"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} queries", '
+                    f"total;dur={total_ms:.1f}"
+                )
+                message.setdefault("headers", []).append((b"server-timing", timing.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total = time.perf_counter() - started
+            path = getattr(scope.get("route"), "path", None)
+            # Routes of mounted sub-apps are relative to their mount point
+            route = scope.get("root_path", "") + path if path else "unmatched"
+            labels = (scope["method"], route, str(status))
+            request_duration.observe(labels, total)
+            db_duration.observe(labels, stats.db_time)
+            db_statements.observe(labels, stats.statements)
+            logger.info(json.dumps({
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "status": status,
+                "db_statements": stats.statements,
+                "db_ms": round(stats.db_time * 1000, 2),
+                "total_ms": round(total * 1000, 2),
+            }))
@@ -0,0 +1,31 @@
+"""
+Schema migration command
+Applies pending migrations from api/migrations, or lists their status.
+
+Run: DATABASE_URL="your_neon_url" python api/migrate.py [upgrade|status]
+"""
+import asyncio
+import os
+import sys
+
+try:
+    from .database import engine
+    from . import migrations
+except ImportError:  # run as a script: python api/migrate.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from api.database import engine
+    from api import migrations
+
+async def main(command: str):
+    if command == "status":
+        for version, description, applied in await migrations.status(engine):
+            print(f"{'✓' if applied else ' '} {version}  {description}")
+    elif command == "upgrade":
+        applied = await migrations.upgrade(engine)
+        print(f"✅ {len(applied)} migration(s) applied" if applied else "✅ Schema is up to date")
+    else:
+        sys.exit(f"Unknown command: {command} (expected upgrade or status)")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
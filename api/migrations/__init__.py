@@ -0,0 +1,84 @@
+"""
+Versioned schema migrations
+Each vNNNN_*.py module in this package defines `description` and
+`async def upgrade(conn)`. Applied versions are recorded in the
+schema_migrations table; pending ones run in filename order, each in its own
+transaction. On PostgreSQL an advisory lock keeps concurrent runners (e.g.
+two cold starts) from applying the same migration twice.
+
+Migrations after the baseline must be idempotent, because the baseline
+creates the schema from the current models on a fresh database. They also
+run on SQLite (local runs), which has no ADD COLUMN IF NOT EXISTS and no
+now() / SERIAL: use add_column() and create_table() below rather than
+PostgreSQL-only DDL, and branch on conn.dialect.name where needed.
+"""
+import importlib
+import pkgutil
+
+from sqlalchemy import inspect, text
+
+# Arbitrary constant identifying this app's migration lock
+ADVISORY_LOCK_KEY = 731_2024
+
+
+async def has_column(conn, table: str, column: str) -> bool:
+    def check(sync_conn):
+        return column in {info["name"] for info in inspect(sync_conn).get_columns(table)}
+    return await conn.run_sync(check)
+
+
+async def add_column(conn, table: str, column: str, ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless the column exists already"""
+    if not await has_column(conn, table, column):
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+async def create_table(conn, table):
+    """CREATE TABLE for a model's Table, unless it exists already"""
+    await conn.run_sync(table.create, checkfirst=True)
+
+
+def discover():
+    """[(version, module)] for every migration module, oldest first"""
+    names = sorted(
+        info.name for info in pkgutil.iter_modules(__path__)
+        if info.name.startswith("v") and info.name[1:5].isdigit()
+    )
+    return [(name, importlib.import_module(f"{__name__}.{name}")) for name in names]
+
+
+async def applied_versions(conn):
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR PRIMARY KEY, "
+        "applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    return set(result.scalars().all())
+
+
+async def upgrade(engine, log=print):
+    """Apply all pending migrations; returns the versions applied"""
+    applied = []
+    for version, module in discover():
+        async with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            # Checked under the lock, so a concurrent runner's work is seen
+            if version in await applied_versions(conn):
+                continue
+            await module.upgrade(conn)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+                {"version": version}
+            )
+        log(f"✓ {version}: {module.description}")
+        applied.append(version)
+    return applied
+
+
+async def status(engine):
+    """[(version, description, applied)] for every known migration"""
+    async with engine.begin() as conn:
+        done = await applied_versions(conn)
+    return [(version, module.description, version in done) for version, module in discover()]
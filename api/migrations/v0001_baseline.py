@@ -0,0 +1,8 @@
+"""Baseline: create any missing tables from the models"""
+from ..database import Base
+from .. import models  # noqa: F401  (registers the tables on Base.metadata)
+
+description = "baseline schema"
+
+async def upgrade(conn):
+    await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,21 @@
+"""Indexes for keyset pagination and full-text product search"""
+from sqlalchemy import text
+
+description = "keyset pagination and product search indexes"
+
+async def upgrade(conn):
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON users (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_products_created_at_id ON products (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_products_category_created_at_id ON products (category, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_deals_created_at_id ON deals (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_messages_deal_id_created_at_id ON messages (deal_id, created_at, id)",
+    ]
+    if conn.dialect.name == "postgresql":
+        # Must match models.product_search_vector() exactly
+        statements.append(
+            "CREATE INDEX IF NOT EXISTS ix_products_search ON products USING gin "
+            "(to_tsvector('simple'::regconfig, coalesce(title, '') || ' ' || coalesce(description, '')))"
+        )
+    for statement in statements:
+        await conn.execute(text(statement))
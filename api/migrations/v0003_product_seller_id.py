@@ -0,0 +1,17 @@
+"""products.seller_id foreign key, backfilled from the seller username"""
+from sqlalchemy import text
+
+from . import add_column
+
+description = "products.seller_id foreign key"
+
+async def upgrade(conn):
+    await add_column(conn, "products", "seller_id", "INTEGER REFERENCES users (id)")
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_products_seller_id ON products (seller_id)"
+    ))
+    await conn.execute(text(
+        "UPDATE products SET seller_id = ("
+        "SELECT users.id FROM users WHERE users.username = products.seller) "
+        "WHERE seller_id IS NULL"
+    ))
@@ -0,0 +1,9 @@
+"""Content-addressed image assets and product image variants"""
+from . import add_column, create_table
+from ..models import ImageAsset
+
+description = "image_assets table and products.image_variants"
+
+async def upgrade(conn):
+    await create_table(conn, ImageAsset.__table__)
+    await add_column(conn, "products", "image_variants", "JSON")
@@ -0,0 +1,16 @@
+"""Indexes for the deal filters used by the API
+
+messages (deal_id, created_at) and products (category, created_at) are
+already covered by the three-column indexes from v0002.
+"""
+from sqlalchemy import text
+
+description = "deals buyer_id / product_id / status indexes"
+
+async def upgrade(conn):
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_deals_buyer_id ON deals (buyer_id)",
+        "CREATE INDEX IF NOT EXISTS ix_deals_product_id ON deals (product_id)",
+        "CREATE INDEX IF NOT EXISTS ix_deals_status ON deals (status)",
+    ]:
+        await conn.execute(text(statement))
@@ -0,0 +1,12 @@
+"""Denormalized deal counters: deals.message_count / last_message_at and deal_stats"""
+from . import add_column, create_table
+from ..counters import rebuild_counters
+from ..models import DealStats
+
+description = "deal message counters and per-status deal_stats"
+
+async def upgrade(conn):
+    await add_column(conn, "deals", "message_count", "INTEGER NOT NULL DEFAULT 0")
+    await add_column(conn, "deals", "last_message_at", "TIMESTAMP WITH TIME ZONE")
+    await create_table(conn, DealStats.__table__)
+    await rebuild_counters(conn)
@@ -0,0 +1,7 @@
+"""deals.version, bumped by every status transition for optimistic concurrency"""
+from . import add_column
+
+description = "deals.version column"
+
+async def upgrade(conn):
+    await add_column(conn, "deals", "version", "INTEGER NOT NULL DEFAULT 1")
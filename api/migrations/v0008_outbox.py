@@ -0,0 +1,9 @@
+"""Transactional outbox for deal side effects (drained by api/worker.py)"""
+from . import create_table
+from ..models import OutboxEvent
+
+description = "outbox table"
+
+async def upgrade(conn):
+    # Includes the partial ix_outbox_pending index (a plain index on SQLite)
+    await create_table(conn, OutboxEvent.__table__)
@@ -0,0 +1,14 @@
+"""Archive table for the chat history of old completed deals (see archive.py)"""
+from sqlalchemy import text
+
+from . import add_column, create_table
+from ..models import MessageArchive
+
+description = "message_archive table and deals.messages_archived_at"
+
+async def upgrade(conn):
+    await add_column(conn, "deals", "messages_archived_at", "TIMESTAMP WITH TIME ZONE")
+    await create_table(conn, MessageArchive.__table__)
+    if conn.dialect.name == "postgresql":
+        # The blobs are gzip already; don't let TOAST try to compress them again
+        await conn.execute(text("ALTER TABLE message_archive ALTER COLUMN data SET STORAGE EXTERNAL"))
@@ -0,0 +1,13 @@
+"""Monthly range partitions of messages on created_at (PostgreSQL, see partitions.py)"""
+from sqlalchemy import text
+
+from ..partitions import partition_messages
+
+description = "partition messages by month"
+
+async def upgrade(conn):
+    if conn.dialect.name != "postgresql":
+        # Other backends keep the plain table; just add the per-deal id index
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_messages_deal_id_id ON messages (deal_id, id)"))
+        return
+    await partition_messages(conn)
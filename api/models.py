@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Index, JSON, LargeBinary, select
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func, literal_column
 from .database import Base
 
 class User(Base):
@@ -12,6 +13,11 @@ class User(Base):
     role = Column(String, default="user")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Keyset pagination indexes: (created_at, id) matches the cursor ordering
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
 class Product(Base):
     __tablename__ = "products"
     
@@ -20,22 +26,71 @@ class Product(Base):
     description = Column(Text, nullable=False)
     price = Column(Float, nullable=False)
     category = Column(String, nullable=False)
-    seller = Column(String, nullable=False)
+    seller = Column(String, nullable=False)  # display name, kept for the client
+    seller_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     image_url = Column(String, nullable=True)
+    # Resized copies of image_url: {"webp": {"thumbnail": url, "card": url, "full": url}, "avif": {...}}
+    image_variants = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_category_created_at_id", "category", "created_at", "id"),
+    )
+
+# Full-text search document for products. Config and separators are rendered
+# as SQL literals (not bound parameters) so the query expression is identical
+# to the GIN index expression and PostgreSQL can use the index.
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+def product_search_vector():
+    return func.to_tsvector(
+        SEARCH_CONFIG,
+        func.coalesce(Product.title, literal_column("''"))
+        + literal_column("' '")
+        + func.coalesce(Product.description, literal_column("''"))
+    )
+
+# PostgreSQL only; other backends (SQLite in local runs) fall back to ILIKE
+Index("ix_products_search", product_search_vector(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
 class Deal(Base):
     __tablename__ = "deals"
     
     id = Column(Integer, primary_key=True, index=True)
-    buyer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
-    status = Column(String, default="pending")
+    buyer_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+    status = Column(String, default="pending", index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped by every status transition (see transitions.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Maintained by send_message (see counters.py)
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    # Set once the chat history has been moved to message_archive (see archive.py)
+    messages_archived_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_deals_created_at_id", "created_at", "id"),
+    )
+
+    # Loaded explicitly with joinedload/selectinload in list endpoints;
+    # lazy="raise" turns an accidental per-row lazy load into an error
+    product = relationship("Product", lazy="raise")
+    buyer = relationship("User", lazy="raise")
+
+class DealStats(Base):
+    """Per-status deal totals, maintained on write (see counters.py)"""
+    __tablename__ = "deal_stats"
+    
+    status = Column(String, primary_key=True)
+    deal_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
 
 class Message(Base):
+    """Chat message; on PostgreSQL the table is partitioned by month (see partitions.py)"""
     __tablename__ = "messages"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -43,4 +98,63 @@ class Message(Base):
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     message = Column(Text, nullable=False)
     is_system = Column(Boolean, default=False)
+    # The partition key
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_messages_deal_id_id", "deal_id", "id"),
+        Index("ix_messages_deal_id_created_at_id", "deal_id", "created_at", "id"),
+        # Ids must not be reused once archived messages are deleted (local SQLite runs)
+        {"sqlite_autoincrement": True},
+    )
+
+class MessageArchive(Base):
+    """Chat history of a finished deal as one gzip-compressed NDJSON blob"""
+    __tablename__ = "message_archive"
+    
+    deal_id = Column(Integer, ForeignKey("deals.id"), primary_key=True)
+    message_count = Column(Integer, nullable=False)
+    first_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    # One MessageOut object per line, oldest first
+    data = Column(LargeBinary, nullable=False)
+
+def deal_messages(deal_id: int):
+    """select(Message) for one deal's chat
+
+    A deal's messages are never older than the deal, so its created_at bounds
+    the query from below and PostgreSQL skips the monthly partitions from
+    before the deal existed.
+    """
+    deal_created_at = select(Deal.created_at).where(Deal.id == deal_id).scalar_subquery()
+    return select(Message).where(Message.deal_id == deal_id, Message.created_at >= deal_created_at)
+
+class OutboxEvent(Base):
+    """Side effect recorded with the change that caused it, run by api/worker.py"""
+    __tablename__ = "outbox"
+    
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Not picked up before this time; pushed back on each failed attempt
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Only undelivered events are ever scanned
+        Index("ix_outbox_pending", "available_at", "id", postgresql_where=processed_at.is_(None)),
+    )
+
+class ImageAsset(Base):
+    """Uploaded image, stored once per distinct content"""
+    __tablename__ = "image_assets"
+    
+    hash = Column(String(64), primary_key=True)  # sha256 of the original bytes
+    url = Column(String, unique=True, nullable=False)
+    content_type = Column(String, nullable=False)
+    variants = Column(JSON, nullable=True)  # same shape as Product.image_variants
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,95 @@
+"""
+Transactional outbox
+Request handlers record side effects (notifications) as
+rows in the outbox table with enqueue(), inside the same transaction as the
+change that caused them: the event exists if and only if the change was
+committed. api/worker.py drains the table in batches, so request latency
+doesn't depend on downstream services.
+
+Events are claimed with FOR UPDATE SKIP LOCKED (several workers can run side
+by side), each is handled in its own savepoint, and failures are retried
+with exponential backoff up to OUTBOX_MAX_ATTEMPTS. Processed events are
+deleted after OUTBOX_RETENTION_DAYS.
+"""
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, delete
+
+from .models import OutboxEvent
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "600"))
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+logger = logging.getLogger("api.outbox")
+
+# topic -> async handler(db, payload)
+HANDLERS = {}
+
+
+def handler(topic: str):
+    """Register the function handling one topic"""
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def enqueue(db, topic: str, payload: dict):
+    """Record an event; it is only visible to the worker once `db` commits"""
+    db.add(OutboxEvent(topic=topic, payload=payload))
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_MAX_BACKOFF, 2 ** attempts))
+
+
+async def drain_batch(db, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Handle up to batch_size due events and commit; returns how many were claimed"""
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(OutboxEvent)
+        .where(
+            OutboxEvent.processed_at.is_(None),
+            OutboxEvent.attempts < OUTBOX_MAX_ATTEMPTS,
+            OutboxEvent.available_at <= now,
+        )
+        .order_by(OutboxEvent.available_at, OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    events = result.scalars().all()
+
+    for event in events:
+        try:
+            # A failing handler only rolls back its own writes
+            async with db.begin_nested():
+                func = HANDLERS.get(event.topic)
+                if func is None:
+                    raise LookupError(f"No handler for topic {event.topic!r}")
+                await func(db, event.payload)
+            event.processed_at = datetime.now(timezone.utc)
+        except Exception as e:
+            event.attempts += 1
+            event.last_error = repr(e)[:2000]
+            event.available_at = datetime.now(timezone.utc) + backoff(event.attempts)
+            log = logger.error if event.attempts >= OUTBOX_MAX_ATTEMPTS else logger.warning
+            log("outbox event %s (%s) failed, attempt %s: %r", event.id, event.topic, event.attempts, e)
+
+    await db.commit()
+    return len(events)
+
+
+async def prune_processed(db, retention_days: float = OUTBOX_RETENTION_DAYS) -> int:
+    """Delete events processed more than retention_days ago and commit; returns how many"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = await db.execute(
+        delete(OutboxEvent)
+        .where(OutboxEvent.processed_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination on (created_at, id), or (rank, id) for ranked search
+Cursors are opaque to clients: urlsafe base64 of the last row's sort key
+"""
+import base64
+import json
+import os
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+def _encode(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return _encode([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, row_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    """Cursor for result lists ordered by (relevance rank, id), best first"""
+    return _encode(["rank", rank, row_id])
+
+
+def decode_rank_cursor(cursor: str):
+    try:
+        kind, rank, row_id = _decode(cursor)
+        if kind != "rank":
+            raise ValueError(kind)
+        return float(rank), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class time_key(FunctionElement):
+    """A timestamp in the form keyset filters compare it in
+
+    The column itself on PostgreSQL (so the composite indexes apply).
+    SQLite stores timestamps as text: CURRENT_TIMESTAMP defaults read
+    'YYYY-MM-DD HH:MM:SS' while bound datetimes render with '.000000', so a
+    string comparison misorders rows within the same second; julianday()
+    compares both as instants.
+    """
+    inherit_cache = True
+
+
+@compiles(time_key)
+def _time_key(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(time_key, "sqlite")
+def _time_key_sqlite(element, compiler, **kw):
+    return f"julianday({compiler.process(element.clauses, **kw)})"
+
+
+def paginate(query, created_col, id_col, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """Apply keyset filter, ordering and limit to a select()
+
+    Fetches one extra row so split_page can tell whether another page exists.
+    """
+    key = tuple_(time_key(created_col), id_col)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        after = tuple_(time_key(literal(created_at, created_col.type)), row_id)
+        query = query.where(key < after if descending else key > after)
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col, id_col)
+    return query.limit(limit + 1)
+
+
+def split_page(rows, limit):
+    """Split the rows of a paginate() query into (page rows, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,126 @@
+"""
+Monthly partitions of the messages table (PostgreSQL)
+messages is range-partitioned on created_at, one partition per calendar
+month (messages_pYYYY_MM) plus messages_default for anything outside them.
+Each partition carries the parent's (deal_id, id) and (deal_id, created_at,
+id) indexes, so one chat's rows sit together in a small partition-local
+index, and queries bounded on created_at (see models.deal_messages) only
+touch the months they can match.
+
+The models describe the plain table used on other backends; partition_messages()
+turns it into the partitioned one. The primary key becomes (id, created_at),
+as PostgreSQL requires for partitioned tables; ids still come from the
+sequence and stay unique.
+
+ensure_partitions() creates the partitions for the coming months. It runs
+from the init path and the nightly archive job; rows for a month without
+its partition land in messages_default and are moved on the next run.
+"""
+import os
+from datetime import date
+
+from sqlalchemy import text
+
+MESSAGE_PARTITIONS_AHEAD = int(os.getenv("MESSAGE_PARTITIONS_AHEAD", "3"))
+
+# Indexes created on the partitioned parent; PostgreSQL adds them to every partition
+PARTITION_INDEXES = {
+    "ix_messages_deal_id_id": "(deal_id, id)",
+    "ix_messages_deal_id_created_at_id": "(deal_id, created_at, id)",
+}
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"messages_p{month.year:04d}_{month.month:02d}"
+
+
+async def is_partitioned(conn) -> bool:
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('messages')"
+    ))
+    return result.first() is not None
+
+
+async def create_partition(conn, month: date):
+    """Create (and attach) one month's partition unless it exists
+
+    The table is built standalone and attached, so rows that went to
+    messages_default for that month can be moved into it first.
+    """
+    name = partition_name(month)
+    if (await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar() is not None:
+        return
+    bounds = {"start": month, "end": add_months(month, 1)}
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await conn.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM messages_default WHERE created_at >= :start AND created_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    await conn.execute(text(
+        f"ALTER TABLE messages ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    ))
+
+
+async def ensure_partitions(conn, months_ahead: int = MESSAGE_PARTITIONS_AHEAD, since: date = None):
+    """Partitions from `since` (default: this month) to months_ahead months from now"""
+    if conn.dialect.name != "postgresql" or not await is_partitioned(conn):
+        return
+    this_month = date.today().replace(day=1)
+    month = (since or this_month).replace(day=1)
+    while month <= add_months(this_month, months_ahead):
+        await create_partition(conn, month)
+        month = add_months(month, 1)
+
+
+async def partition_messages(conn):
+    """Convert messages into the partitioned layout, copying existing rows
+
+    Holds an exclusive lock on messages while the rows are copied; on a
+    large table run it off-peak. Does nothing on other backends or when
+    messages is already partitioned.
+    """
+    if conn.dialect.name != "postgresql" or await is_partitioned(conn):
+        return
+    await conn.execute(text("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE"))
+    sequence = (await conn.execute(text("SELECT pg_get_serial_sequence('messages', 'id')"))).scalar()
+    oldest = (await conn.execute(text("SELECT min(created_at) FROM messages"))).scalar()
+
+    # Move the old table aside, freeing its constraint and index names;
+    # the sequence outlives it and is handed to the new table
+    await conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    await conn.execute(text("ALTER TABLE messages RENAME TO messages_unpartitioned"))
+    await conn.execute(text("ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey"))
+    for name in PARTITION_INDEXES:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    await conn.execute(text(
+        "CREATE TABLE messages ("
+        f"id INTEGER NOT NULL DEFAULT nextval('{sequence}'::regclass), "
+        "deal_id INTEGER NOT NULL REFERENCES deals (id), "
+        "sender_id INTEGER NOT NULL REFERENCES users (id), "
+        "message TEXT NOT NULL, "
+        "is_system BOOLEAN DEFAULT false, "
+        "created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), "
+        "PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    ))
+    await conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY messages.id"))
+    for name, columns in PARTITION_INDEXES.items():
+        await conn.execute(text(f"CREATE INDEX {name} ON messages {columns}"))
+    await conn.execute(text("CREATE TABLE messages_default PARTITION OF messages DEFAULT"))
+    # Partitions first, so the copied rows go straight to their month
+    await ensure_partitions(conn, since=oldest.date() if oldest else None)
+
+    await conn.execute(text(
+        "INSERT INTO messages (id, deal_id, sender_id, message, is_system, created_at) "
+        "SELECT id, deal_id, sender_id, message, is_system, coalesce(created_at, now()) "
+        "FROM messages_unpartitioned"
+    ))
+    await conn.execute(text("DROP TABLE messages_unpartitioned"))
@@ -0,0 +1,215 @@
+"""
+Request admission control
+- Token-bucket rate limits on write endpoints, keyed per user (from the
+  access token) or per client IP. RATE_LIMIT_BACKEND selects where buckets
+  live: "memory" (default, per process) or "redis" (shared between instances,
+  needs the redis package and REDIS_URL).
+- A global cap on requests concurrently holding a DB session; excess
+  requests wait briefly, then fail fast with 503 instead of piling onto the
+  database. In pooled mode it never exceeds the connection pool.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from fastapi import HTTPException, Request
+
+from . import database
+from .auth import decode_access_token
+
+logger = logging.getLogger("api.ratelimit")
+
+
+class MemoryBackend:
+    """Buckets in a bounded in-process LRU dict"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int):
+        """Consume one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class RedisBackend:
+    """Buckets in Redis, updated atomically by a Lua script"""
+
+    SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[2])
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'u') or ARGV[3])
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # optional dependency
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key, rate, burst):
+        allowed, tokens = await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()])
+        allowed = bool(int(allowed))
+        return allowed, 0.0 if allowed else (1 - float(tokens)) / rate
+
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        kind = os.getenv("RATE_LIMIT_BACKEND", "memory")
+        if kind == "redis":
+            _backend = RedisBackend(os.environ["REDIS_URL"])
+        elif kind == "memory":
+            _backend = MemoryBackend()
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {kind!r}")
+    return _backend
+
+
+# Proxies in front of the app that append to X-Forwarded-For (0: none, use the peer address)
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+
+def client_ip(request: Request) -> str:
+    """The caller's address as seen by the outermost proxy we trust
+
+    X-Forwarded-For hops left of those our proxies appended are whatever
+    the client sent, so only the TRUSTED_PROXY_HOPS-th entry from the right
+    is used. On Vercel, x-real-ip is set by the edge and can't be spoofed.
+    """
+    if os.getenv("VERCEL") and request.headers.get("x-real-ip"):
+        return request.headers["x-real-ip"]
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and TRUSTED_PROXY_HOPS > 0:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request, by: str) -> str:
+    if by == "user":
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            try:
+                return f"user:{decode_access_token(auth[7:]).id}"
+            except HTTPException:
+                pass  # invalid token: the route itself will reject it
+    return f"ip:{client_ip(request)}"
+
+
+def rate_limit(name: str, per_minute: float, burst: int, by: str = "user"):
+    """Dependency enforcing a token bucket of per_minute refill and burst size
+
+    by="user" keys on the authenticated user, falling back to the client IP.
+    """
+    rate = per_minute / 60
+
+    async def dependency(request: Request):
+        key = f"{name}:{client_key(request, by)}"
+        allowed, retry_after = await get_backend().take(key, rate, burst)
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    return dependency
+
+
+class ConcurrencyLimiter:
+    """Caps concurrent holders of a slot; waiters give up after queue_timeout"""
+
+    def __init__(self, limit: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        # Whether the current request holds its slot (see suspended)
+        self._held = ContextVar(f"slot_held_{id(self)}", default=None)
+
+    async def _acquire(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+    @asynccontextmanager
+    async def slot(self):
+        await self._acquire()
+        held = [True]
+        self._held.set(held)
+        try:
+            yield
+        finally:
+            if held[0]:
+                self._semaphore.release()
+
+    @asynccontextmanager
+    async def suspended(self):
+        """Give the current request's slot back while idling (e.g. a long-poll wait)"""
+        held = self._held.get()
+        if not held or not held[0]:
+            yield
+            return
+        self._semaphore.release()
+        held[0] = False
+        try:
+            yield
+        finally:
+            await self._acquire()
+            held[0] = True
+
+
+def admission_limit() -> int:
+    """DB_MAX_CONCURRENCY, defaulting to and capped at the pool's capacity
+
+    Requests admitted beyond the pool would wait out pool_timeout and fail
+    with a 500 instead of being turned away with a 503 here.
+    """
+    capacity = database.pool_capacity()
+    configured = os.getenv("DB_MAX_CONCURRENCY")
+    if configured is None:
+        return capacity or 20
+    limit = int(configured)
+    if capacity is not None and limit > capacity:
+        logger.warning(
+            "DB_MAX_CONCURRENCY=%s exceeds DB_POOL_SIZE + DB_MAX_OVERFLOW; using %s", limit, capacity
+        )
+        return capacity
+    return limit
+
+
+db_admission = ConcurrencyLimiter(
+    limit=admission_limit(),
+    queue_timeout=float(os.getenv("DB_QUEUE_TIMEOUT", "0.5"))
+)
@@ -0,0 +1,46 @@
+"""
+In-process pub/sub hub for deal chat events
+Events only reach sockets connected to the same process, so push works on a
+single long-running uvicorn worker; serverless clients keep polling.
+"""
+import asyncio
+from collections import defaultdict
+
+# Per-subscriber backlog; a socket that falls this far behind is dropped
+QUEUE_SIZE = 100
+
+
+class DealHub:
+    """Fan-out of committed deal events to the sockets watching that deal"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, deal_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[deal_id].add(queue)
+        return queue
+
+    def unsubscribe(self, deal_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(deal_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[deal_id]
+
+    def publish(self, deal_id: int, event: dict):
+        """Queue an event for every subscriber; call only after the commit"""
+        for queue in list(self._subscribers.get(deal_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: replace its backlog with a None sentinel so the
+                # socket closes and the client reloads history on reconnect
+                self.unsubscribe(deal_id, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+deal_hub = DealHub()
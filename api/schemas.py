@@ -0,0 +1,109 @@
+"""
+Response models shared by the API routes
+They validate straight from ORM rows (from_attributes), so routes return rows
+instead of hand-built dicts and pydantic-core serializes a whole page in one
+pass; the apps render the result with ORJSONResponse.
+"""
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, TypeVar
+
+from pydantic import AliasPath, BaseModel, ConfigDict, Field, computed_field
+
+T = TypeVar("T")
+
+
+class ORMModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class Page(BaseModel, Generic[T]):
+    """One keyset page; pass next_cursor back as ?cursor= for the next one"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class UserOut(ORMModel):
+    id: int
+    username: str
+    email: Optional[str] = None
+    role: str
+
+
+class AdminUserOut(UserOut):
+    is_banned: bool = False  # Add this field to User model if needed
+
+    @computed_field
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+class AuthOut(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    user: UserOut
+    message: Optional[str] = None
+
+
+class ProductOut(ORMModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    price: float
+    category: str
+    seller: str
+    image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+
+
+class DealProductOut(ORMModel):
+    """The product as embedded in deal responses"""
+    id: int
+    title: str
+    description: Optional[str] = None
+    price: float
+    seller: str
+    seller_id: Optional[int] = None
+    image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, Any]] = None
+
+
+class DealSummaryOut(ORMModel):
+    """Deal columns only; safe on rows whose relationships aren't loaded"""
+    id: int
+    buyer_id: int
+    product_id: int
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    version: int = 1
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
+    messages_archived_at: Optional[datetime] = None
+
+
+class DealOut(DealSummaryOut):
+    product: Optional[DealProductOut] = None
+
+
+class DealDetailOut(DealOut):
+    buyer_username: str = Field("Unknown", validation_alias=AliasPath("buyer", "username"))
+
+
+class MessageOut(ORMModel):
+    id: int
+    deal_id: int
+    sender_id: int
+    message: str
+    is_system: bool = False
+    created_at: datetime
+
+
+class AdminStatsOut(BaseModel):
+    total_users: int
+    total_products: int
+    completed_deals: int
+    total_revenue: float
+    deals_by_status: Dict[str, int] = {}
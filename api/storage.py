@@ -0,0 +1,141 @@
+"""
+Pluggable blob storage for uploaded files
+BLOB_BACKEND selects the implementation: "vercel" (default) or "local"
+"""
+import asyncio
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator
+
+if TYPE_CHECKING:
+    import httpx
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StorageError(Exception):
+    """Upload rejected or failed by the blob backend"""
+
+
+class SizeLimitedReader:
+    """Async iterator over an UploadFile in fixed-size chunks
+
+    Stops with StorageError once more than max_bytes have been read, so an
+    oversized upload is aborted mid-stream instead of being buffered first.
+    """
+
+    def __init__(self, file, max_bytes: int, chunk_size: int = CHUNK_SIZE):
+        self.file = file
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.too_large = False
+
+    async def __aiter__(self):
+        while True:
+            chunk = await self.file.read(self.chunk_size)
+            if not chunk:
+                return
+            self.bytes_read += len(chunk)
+            if self.bytes_read > self.max_bytes:
+                self.too_large = True
+                raise StorageError("File too large")
+            yield chunk
+
+
+async def iter_chunks(fileobj, chunk_size: int = CHUNK_SIZE):
+    """Async chunk stream over a local file-like object (spool or BytesIO)"""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class BlobStorage:
+    """Interface: store a stream of chunks under name, return its public URL"""
+
+    async def put(self, name: str, chunks: AsyncIterator[bytes], content_type: str) -> str:
+        raise NotImplementedError
+
+
+class VercelBlobStorage(BlobStorage):
+    API_URL = "https://blob.vercel-storage.com"
+
+    def __init__(self, token: str):
+        self.token = token
+
+    async def put(self, name, chunks, content_type):
+        response = await get_http_client().put(
+            f"{self.API_URL}/{name}",
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "x-content-type": content_type,
+                "x-add-random-suffix": "0"  # names are content-addressed
+            },
+            content=chunks,
+        )
+        if response.status_code != 200:
+            raise StorageError(f"Upload failed: {response.text}")
+        return response.json().get("url")
+
+
+class LocalBlobStorage(BlobStorage):
+    """Files under a local directory; for development and tests"""
+
+    def __init__(self, root: str, base_url: str = "/uploads"):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    async def put(self, name, chunks, content_type):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        try:
+            with open(partial, "wb") as f:
+                async for chunk in chunks:
+                    await asyncio.to_thread(f.write, chunk)
+            os.replace(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return f"{self.base_url}/{name}"
+
+
+# One pooled client per event loop: serverless invocations may run on a fresh
+# loop, and an httpx client can't be reused across loops
+_http_client = None
+_http_client_loop = None
+
+def get_http_client() -> "httpx.AsyncClient":
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop or _http_client.is_closed:
+        import httpx  # deferred: only the Vercel Blob backend needs it, keep it off cold start
+        _http_client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+        _http_client_loop = loop
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+def get_storage() -> BlobStorage:
+    backend = os.getenv("BLOB_BACKEND", "vercel")
+    if backend == "local":
+        return LocalBlobStorage(
+            os.getenv("LOCAL_BLOB_DIR", "uploads"),
+            os.getenv("LOCAL_BLOB_URL", "/uploads")
+        )
+    if backend == "vercel":
+        token = os.getenv("BLOB_READ_WRITE_TOKEN")
+        if not token:
+            raise StorageError("Blob storage not configured")
+        return VercelBlobStorage(token)
+    raise StorageError(f"Unknown BLOB_BACKEND: {backend}")
@@ -0,0 +1,148 @@
+"""
+Deal state machine
+A status change is one conditional UPDATE ... WHERE status = :expected
+RETURNING, so two parties acting on the same deal can't both win: the loser
+matches no row and gets a 409. The same transaction bumps deals.version,
+moves the deal_stats counters, writes a system message into the chat and
+queues a deal.status_changed outbox event for the notifications.
+
+    pending -> accepted -> payment_sent -> completed
+    pending -> rejected
+    pending / accepted / payment_sent -> cancelled
+
+Sellers may complete straight from accepted (the buyer pastes the Steam card
+code in the chat instead of marking the payment as sent).
+
+Only the deal's seller accepts, rejects and completes it, only its buyer
+marks the payment as sent, and either may cancel; admins may make any move.
+"""
+from fastapi import HTTPException
+from sqlalchemy import select, update, insert, func, or_
+
+from .counters import move_deal_status
+from .models import Deal, Message, Product
+from .outbox import enqueue
+
+DEAL_TRANSITIONS = {
+    "pending": {"accepted", "rejected", "cancelled"},
+    "accepted": {"payment_sent", "completed", "cancelled"},
+    "payment_sent": {"completed", "cancelled"},
+    "completed": set(),
+    "rejected": set(),
+    "cancelled": set(),
+}
+DEAL_STATUSES = list(DEAL_TRANSITIONS)
+
+# The parties that may move a deal into each status
+TRANSITION_ACTORS = {
+    "accepted": {"seller"},
+    "rejected": {"seller"},
+    "payment_sent": {"buyer"},
+    "completed": {"seller"},
+    "cancelled": {"buyer", "seller"},
+}
+
+
+def check_transition(old: str, new: str):
+    if new not in DEAL_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {new}")
+    if new not in DEAL_TRANSITIONS.get(old, ()):
+        raise HTTPException(status_code=409, detail=f"Deal is {old}; it can't be moved to {new}")
+
+
+async def deal_state(db, deal_id: int):
+    """(status, version, buyer_id, seller_id) of a deal, or None"""
+    result = await db.execute(
+        select(Deal.status, Deal.version, Deal.buyer_id, Product.seller_id)
+        .join(Product, Product.id == Deal.product_id)
+        .where(Deal.id == deal_id)
+    )
+    return result.one_or_none()
+
+
+def may_move(state, new: str, actor_id: int, actor_role: str) -> bool:
+    if actor_role == "admin":
+        return True
+    parties = TRANSITION_ACTORS.get(new, set())
+    return ("buyer" in parties and state.buyer_id == actor_id) or ("seller" in parties and state.seller_id == actor_id)
+
+
+async def explain_rejection(db, deal_id: int, new: str, actor_id: int, actor_role: str, expected: str, version: int = None):
+    """Raise the error for a transition that didn't apply, from the deal's actual state"""
+    state = await deal_state(db, deal_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    if not may_move(state, new, actor_id, actor_role):
+        parties = " or ".join(sorted(TRANSITION_ACTORS.get(new, ())))
+        raise HTTPException(status_code=403, detail=f"Only the deal's {parties} can move it to {new}")
+    if state.status != expected or (version is not None and state.version != version):
+        # Lost the race, or the caller's view is stale
+        raise HTTPException(
+            status_code=409,
+            detail=f"Deal is {state.status} (version {state.version}); it was changed by someone else"
+        )
+    check_transition(state.status, new)
+    raise HTTPException(status_code=409, detail=f"Deal is {state.status}; it can't be moved to {new}")
+
+
+async def transition_deal(db, deal_id: int, new: str, actor_id: int, actor_role: str = "user",
+                          expected: str = None, version: int = None):
+    """Move a deal to `new` on behalf of the actor; returns (deal, system message)
+
+    `expected` is the status the caller last saw (and `version` optionally
+    the version); without it the current status is read first, which costs a
+    round trip but is still checked again by the UPDATE. Whether the actor
+    is the right party is checked by the same UPDATE.
+    """
+    if new not in DEAL_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {new}")
+    if expected is None:
+        state = await deal_state(db, deal_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Deal not found")
+        expected = state.status
+    if new not in DEAL_TRANSITIONS.get(expected, ()):
+        await explain_rejection(db, deal_id, new, actor_id, actor_role, expected, version)
+
+    values = {
+        "status": new,
+        "version": Deal.version + 1,
+        "message_count": Deal.message_count + 1,  # the system message below
+        "last_message_at": func.now(),
+    }
+    if new == "completed":
+        values["completed_at"] = func.now()
+
+    conditions = [Deal.id == deal_id, Deal.status == expected]
+    if version is not None:
+        conditions.append(Deal.version == version)
+    if actor_role != "admin":
+        parties = TRANSITION_ACTORS[new]
+        allowed = []
+        if "buyer" in parties:
+            allowed.append(Deal.buyer_id == actor_id)
+        if "seller" in parties:
+            allowed.append(Deal.product_id.in_(select(Product.id).where(Product.seller_id == actor_id)))
+        conditions.append(or_(*allowed))
+
+    price = select(Product.price).where(Product.id == Deal.product_id).scalar_subquery()
+    result = await db.execute(
+        update(Deal)
+        .where(*conditions)
+        .values(**values)
+        .returning(Deal, price)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is None:
+        await explain_rejection(db, deal_id, new, actor_id, actor_role, expected, version)
+    deal, price = row
+
+    await move_deal_status(db, expected, new, price)
+    enqueue(db, "deal.status_changed", {"deal_id": deal_id, "old": expected, "new": new, "actor_id": actor_id})
+    result = await db.execute(
+        insert(Message)
+        .values(deal_id=deal_id, sender_id=actor_id, message=f"Status changed: {expected} → {new}", is_system=True)
+        .returning(Message)
+    )
+    return deal, result.scalar_one()
@@ -0,0 +1,168 @@
+"""
+Image upload endpoint, mounted at /api/upload
+Served by its own app, imported on first use (see lazy.py), so image
+processing and the blob storage client stay off the cold-start path of the
+public API.
+"""
+import asyncio
+import io
+import os
+
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import get_db
+from .models import ImageAsset
+from .storage import SizeLimitedReader, StorageError, iter_chunks, get_storage
+from .images import RESIZABLE_TYPES, spool_and_hash, render_variants
+from .ratelimit import rate_limit
+from .auth import TokenUser, current_user
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class BodySizeLimit:
+    """ASGI middleware capping request bodies before they are parsed
+
+    FastAPI reads and spools the whole multipart form before the route (or
+    any dependency) runs, so the file size checks in upload_image alone would
+    only reject an oversized upload once it had been received and written to
+    disk. A declared Content-Length over the limit is refused up front;
+    bodies without one (chunked) are counted as they arrive and cut off once
+    they pass it.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            response = ORJSONResponse({"detail": "File too large. Max 5MB"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside form parsing; FastAPI passes HTTPException through
+                    raise HTTPException(status_code=413, detail="File too large. Max 5MB")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app = FastAPI(title="CarX Mods Club API - uploads", default_response_class=ORJSONResponse)
+app.add_middleware(BodySizeLimit, max_bytes=MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD)
+
+@app.post("/image", dependencies=[Depends(rate_limit("upload_image", per_minute=10, burst=5))])
+async def upload_image(
+    file: UploadFile = File(...),
+    user: TokenUser = Depends(current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload image to blob storage, deduplicated by content hash, with resized variants"""
+    print(f"Upload attempt - filename: {file.filename}, content_type: {file.content_type}")
+    
+    # Validate file type - be more lenient
+    allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp", "image/x-icon", "image/vnd.microsoft.icon", "image/svg+xml"]
+    allowed_extensions = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'ico', 'svg']
+    content_type = file.content_type or ""
+    
+    # Check if it's an image by extension if content_type is missing
+    if content_type not in allowed_types:
+        if file.filename:
+            ext = file.filename.lower().split('.')[-1]
+            if ext in allowed_extensions:
+                # Map extension to proper content type
+                type_map = {
+                    'jpg': 'image/jpeg',
+                    'jpeg': 'image/jpeg',
+                    'png': 'image/png',
+                    'gif': 'image/gif',
+                    'webp': 'image/webp',
+                    'ico': 'image/x-icon',
+                    'svg': 'image/svg+xml'
+                }
+                content_type = type_map.get(ext, 'image/jpeg')
+            else:
+                raise HTTPException(status_code=400, detail=f"Invalid file extension: .{ext}. Allowed: JPG, PNG, GIF, WEBP, ICO, SVG")
+        else:
+            raise HTTPException(status_code=400, detail="Invalid file type. Only images allowed")
+    
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail=f"File too large ({file.size / (1024 * 1024):.1f}MB). Max 5MB")
+    
+    # Read in chunks, enforcing the limit and hashing as we go
+    reader = SizeLimitedReader(file, MAX_UPLOAD_BYTES)
+    try:
+        digest, spool = await spool_and_hash(reader)
+    except StorageError:
+        raise HTTPException(status_code=400, detail="File too large. Max 5MB")
+    print(f"File size: {reader.bytes_read / (1024 * 1024):.2f}MB")
+    
+    # Same bytes uploaded before: reuse the stored original and its variants
+    asset = await db.get(ImageAsset, digest)
+    if asset:
+        spool.close()
+        return {
+            "success": True,
+            "url": asset.url,
+            "filename": file.filename,
+            "hash": asset.hash,
+            "variants": asset.variants
+        }
+    
+    with spool:
+        variants = None
+        if content_type in RESIZABLE_TYPES:
+            try:
+                rendered = await render_variants(spool.read())
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+            spool.seek(0)
+        
+        ext = os.path.splitext(file.filename or "")[1].lower() or "." + content_type.split("/")[-1]
+        try:
+            storage = get_storage()
+            url = await storage.put(f"images/{digest}{ext}", iter_chunks(spool), content_type)
+            if content_type in RESIZABLE_TYPES:
+                names = [(fmt, name) for fmt, sizes in rendered.items() for name in sizes]
+                urls = await asyncio.gather(*(
+                    storage.put(f"images/{digest}/{name}.{fmt}", iter_chunks(io.BytesIO(rendered[fmt][name])), f"image/{fmt}")
+                    for fmt, name in names
+                ))
+                variants = {}
+                for (fmt, name), variant_url in zip(names, urls):
+                    variants.setdefault(fmt, {})[name] = variant_url
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Upload error: {str(e)}")
+    
+    db.add(ImageAsset(hash=digest, url=url, content_type=content_type, variants=variants))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()  # the same bytes were uploaded concurrently
+    
+    return {
+        "success": True,
+        "url": url,
+        "filename": file.filename,
+        "hash": digest,
+        "variants": variants
+    }
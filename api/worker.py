@@ -0,0 +1,121 @@
+"""
+Outbox worker
+Drains the outbox table (see outbox.py) and runs the deal side effects
+(Telegram notifications), and prunes events processed long enough ago.
+
+Run: DATABASE_URL="your_neon_url" python -m api.worker [--once]
+(the Procfile's `worker` process)
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import time
+
+from sqlalchemy import select
+
+from .database import new_session, get_engine
+from .models import Deal, Product, User
+from .outbox import handler, drain_batch, prune_processed, OUTBOX_BATCH_SIZE
+from .storage import get_http_client, close_http_client
+
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_PRUNE_INTERVAL = float(os.getenv("OUTBOX_PRUNE_INTERVAL", "3600"))
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+
+logger = logging.getLogger("api.outbox")
+
+
+async def notify(text: str):
+    """Post to the shop's Telegram chat; logged only when no bot is configured"""
+    if not (TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID):
+        logger.info("notification: %s", text)
+        return
+    response = await get_http_client().post(
+        f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
+        json={"chat_id": TELEGRAM_CHAT_ID, "text": text}
+    )
+    response.raise_for_status()
+
+
+async def deal_summary(db, deal_id: int):
+    result = await db.execute(
+        select(Product.title, User.username)
+        .select_from(Deal)
+        .join(Product, Product.id == Deal.product_id)
+        .join(User, User.id == Deal.buyer_id)
+        .where(Deal.id == deal_id)
+    )
+    row = result.one_or_none()
+    return f"#{deal_id} {row.title} (buyer {row.username})" if row else f"#{deal_id}"
+
+
+@handler("notify")
+async def on_notify(db, payload):
+    await notify(payload["text"])
+
+
+@handler("deal.created")
+async def on_deal_created(db, payload):
+    await notify(f"New deal {await deal_summary(db, payload['deal_id'])}")
+
+
+@handler("deal.status_changed")
+async def on_deal_status_changed(db, payload):
+    summary = await deal_summary(db, payload["deal_id"])
+    await notify(f"Deal {summary}: {payload['old']} → {payload['new']}")
+
+
+@handler("deal.steam_card_code")
+async def on_steam_card_code(db, payload):
+    # The code itself was written to the deal chat by the request
+    await notify(f"Steam card code received for deal {await deal_summary(db, payload['deal_id'])}")
+
+
+async def run(once: bool = False):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    logger.info("outbox worker started")
+    pruned_at = 0.0
+    try:
+        while not stop.is_set():
+            if time.monotonic() - pruned_at >= OUTBOX_PRUNE_INTERVAL:
+                async with new_session() as db:
+                    pruned = await prune_processed(db)
+                if pruned:
+                    logger.info("pruned %s processed outbox event(s)", pruned)
+                pruned_at = time.monotonic()
+            async with new_session() as db:
+                claimed = await drain_batch(db)
+            if once and not claimed:
+                break
+            if claimed < OUTBOX_BATCH_SIZE and not once:
+                # Caught up; wait for new events (or a shutdown signal)
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        await close_http_client()
+        await get_engine().dispose()
+    logger.info("outbox worker stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the outbox table")
+    parser.add_argument("--once", action="store_true", help="exit when no due events are left")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(run(once=args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Benchmarks for the API; run from the repository root with python -m bench.<name>
@@ -0,0 +1,21 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+import statistics
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(latencies_ms, elapsed_s):
+    """Throughput and latency percentiles for one benchmark run"""
+    return {
+        "requests": len(latencies_ms),
+        "throughput_rps": round(len(latencies_ms) / elapsed_s, 1) if elapsed_s else None,
+        "p50_ms": round(statistics.median(latencies_ms), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+    }
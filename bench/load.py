@@ -0,0 +1,172 @@
+"""
+Load test of the main API endpoints
+
+Seeds the database from DATABASE_URL (PostgreSQL, or SQLite via
+sqlite+aiosqlite:///bench.db) using the seed functions in api/init_db.py, then
+drives each endpoint in-process through the ASGI app with concurrent clients.
+Reports throughput, p50/p95/p99 latency and DB statements per request, and
+writes the results as JSON so runs can be compared between commits.
+
+Run: DATABASE_URL="sqlite+aiosqlite:///bench.db" python -m bench.load [--no-seed] [--compare bench/results/<old>.json]
+The seed step drops and recreates all tables - never point it at production.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import engine
+from api.auth import create_access_token
+from api.index import app
+from api.init_db import create_tables, seed_demo, seed_volume
+from api.models import User, Product, Deal
+from bench.common import summarize
+
+# name -> path factory taking the seeded ids
+SCENARIOS = {
+    "products": lambda ids: "/api/products",
+    "products_category": lambda ids: "/api/products?category=" + random.choice(["Cars", "Audio", "Maps", "Liveries", "Parts"]),
+    "products_search": lambda ids: "/api/products?search=" + random.choice(["drift", "turbo", "classic track"]),
+    "product_detail": lambda ids: f"/api/products/{random.choice(ids['products'])}",
+    "deals": lambda ids: "/api/deals",
+    "deal_detail": lambda ids: f"/api/deals/{random.choice(ids['deals'])}",
+    "messages": lambda ids: f"/api/deals/{random.choice(ids['deals'])}/messages",
+    "admin_stats": lambda ids: "/api/admin/stats",
+    "admin_users": lambda ids: "/api/admin/users",
+}
+
+
+class StatementCounter:
+    """Counts SQL statements executed on the app's engine"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def seed(args):
+    await create_tables(drop=True)
+    async with AsyncSession(engine) as session:
+        await seed_demo(session)
+        await seed_volume(session, users=args.users, products=args.products, deals=args.deals, messages=args.messages)
+
+
+async def load_ids():
+    async with AsyncSession(engine) as session:
+        return {
+            "products": (await session.execute(select(Product.id))).scalars().all(),
+            "deals": (await session.execute(select(Deal.id))).scalars().all(),
+        }
+
+
+async def admin_headers():
+    """Bearer token for the seeded admin, so admin endpoints can be driven too"""
+    async with AsyncSession(engine) as session:
+        admin = (await session.execute(select(User).where(User.role == "admin"))).scalars().first()
+    return {"Authorization": f"Bearer {create_access_token(admin)}"}
+
+
+async def run_scenario(client, counter, make_path, ids, requests, concurrency):
+    # Statements per request: one isolated request, so concurrent ones don't mix in
+    before = counter.count
+    await client.get(make_path(ids))
+    statements = counter.count - before
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one_request():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(make_path(ids))
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {**summarize(latencies, elapsed), "statements_per_request": statements, "errors": errors}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results, baseline=None):
+    print(f"{'endpoint':<18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'stmts':>6}")
+    for name, r in results["endpoints"].items():
+        line = f"{name:<18} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['statements_per_request']:>6}"
+        old = (baseline or {}).get("endpoints", {}).get(name)
+        if old:
+            line += f"   p95 {r['p95_ms'] - old['p95_ms']:+.2f} ms, stmts {r['statements_per_request'] - old['statements_per_request']:+d}"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data already in the database")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--deals", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--only", nargs="*", choices=sorted(SCENARIOS), help="endpoints to run")
+    parser.add_argument("--output", help="JSON path (default bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        await seed(args)
+    ids = await load_ids()
+    counter = StatementCounter()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "database": engine.dialect.name,
+        "volumes": None if args.no_seed else {"users": args.users, "products": args.products, "deals": args.deals, "messages": args.messages},
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "endpoints": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    headers = await admin_headers()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for name in args.only or SCENARIOS:
+            results["endpoints"][name] = await run_scenario(
+                client, counter, SCENARIOS[name], ids, args.requests, args.concurrency
+            )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join("bench", "results", f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
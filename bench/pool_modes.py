@@ -0,0 +1,63 @@
+"""
+Per-request latency of the serverless (NullPool) and pooled engine modes
+
+Each simulated request opens a session, runs one query and closes it, the
+same lifecycle as the get_db dependency.
+
+Run: DATABASE_URL="your_neon_url" python -m bench.pool_modes [--requests 200] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from api.database import DATABASE_URL, create_engine_for_mode
+from bench.common import summarize
+
+
+async def run_mode(mode: str, requests: int, concurrency: int):
+    engine = create_engine_for_mode(DATABASE_URL, mode)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request():
+        async with semaphore:
+            started = time.perf_counter()
+            async with session_maker() as session:
+                await session.execute(text("SELECT 1"))
+                await session.commit()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # Warm-up so the pooled mode is measured with open connections
+    await one_request()
+    latencies.clear()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    return {"mode": mode, "concurrency": concurrency, **summarize(latencies, elapsed)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    results = [
+        await run_mode(mode, args.requests, args.concurrency)
+        for mode in ("serverless", "pooled")
+    ]
+    for r in results:
+        print(f"{r['mode']:<11} {r['throughput_rps']:>8} req/s   p50 {r['p50_ms']:>8} ms   p99 {r['p99_ms']:>8} ms")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
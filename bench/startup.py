@@ -0,0 +1,74 @@
+"""
+Cold-start import budget for the Vercel entry point
+
+Imports api.index in fresh interpreters under `python -X importtime`, reports
+the median total import time and the slowest modules, and exits non-zero when
+the median exceeds the budget or a module that should load lazily (DB driver,
+httpx, Pillow, the admin/upload route apps) shows up on the import path.
+FastAPI itself accounts for most of the budget; set STARTUP_BUDGET_MS to suit
+the machine the check runs on.
+No database is needed: the engine is only built on the first query.
+
+Run: python -m bench.startup [--budget-ms 1500] [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Must not be imported by `import api.index`
+LAZY_MODULES = ["asyncpg", "httpx", "PIL", "api.admin", "api.uploads"]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile():
+    """{module: cumulative microseconds} for one cold import of api.index"""
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.index"],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        sys.exit(f"import api.index failed:\n{result.stderr[-2000:]}")
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            profile[match.group(4)] = int(match.group(2))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1500")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # The first run also warms the bytecode cache; it is not counted
+    import_profile()
+    profiles = [import_profile() for _ in range(args.runs)]
+    totals_ms = [profile["api.index"] / 1000 for profile in profiles]
+    median_ms = statistics.median(totals_ms)
+
+    slowest = sorted(profiles[-1].items(), key=lambda item: item[1], reverse=True)[:args.top]
+    for module, micros in slowest:
+        print(f"{micros / 1000:>9.1f} ms  {module}")
+    print(f"\nimport api.index: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"cold import took {median_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    eager = [name for name in LAZY_MODULES if name in profiles[-1]]
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
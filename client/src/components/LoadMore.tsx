@@ -0,0 +1,23 @@
+import { useTranslation } from 'react-i18next'
+
+interface LoadMoreProps {
+  hasMore: boolean
+  loading: boolean
+  onClick: () => void
+}
+
+// "Load more" under a cursor-paged list; renders nothing on the last page
+const LoadMore = ({ hasMore, loading, onClick }: LoadMoreProps) => {
+  const { t } = useTranslation()
+  if (!hasMore) return null
+
+  return (
+    <div className="text-center mt-8">
+      <button onClick={onClick} disabled={loading} className="btn btn-secondary">
+        {loading ? t('loading') : t('load_more')}
+      </button>
+    </div>
+  )
+}
+
+export default LoadMore
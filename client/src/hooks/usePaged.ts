@@ -0,0 +1,46 @@
+import { useCallback, useEffect, useRef, useState } from 'react'
+import { Page } from '../services/api'
+
+// A cursor-paged list: the first page on mount and on reload(), the next one
+// appended on loadMore() while the server returns a next_cursor.
+export const usePaged = <T>(fetchPage: (cursor?: string) => Promise<Page<T>>) => {
+  const [items, setItems] = useState<T[]>([])
+  const [cursor, setCursor] = useState<string | null>(null)
+  const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const fetchRef = useRef(fetchPage)
+  fetchRef.current = fetchPage
+
+  const reload = useCallback(async () => {
+    setLoading(true)
+    try {
+      const page = await fetchRef.current()
+      setItems(page.items)
+      setCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Failed to load list:', error)
+    } finally {
+      setLoading(false)
+    }
+  }, [])
+
+  const loadMore = useCallback(async () => {
+    if (!cursor) return
+    setLoadingMore(true)
+    try {
+      const page = await fetchRef.current(cursor)
+      setItems((prev) => [...prev, ...page.items])
+      setCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Failed to load more:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }, [cursor])
+
+  useEffect(() => {
+    reload()
+  }, [reload])
+
+  return { items, loading, loadingMore, hasMore: cursor !== null, loadMore, reload }
+}
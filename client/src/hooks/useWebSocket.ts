@@ -1,4 +1,4 @@
-import { useEffect, useRef } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { useAuthStore } from '../store/authStore'
 
 export const useWebSocket = () => {
@@ -98,3 +98,66 @@ export const useWebSocket = () => {
 
   return wsRef.current
 }
+
+export interface DealSocketEvent {
+  type: 'new_message' | 'deal_update'
+  deal_id: number
+  message?: any
+  status?: string
+}
+
+// Subscribe to server-pushed events of one deal. Returns whether the socket is
+// open so callers can fall back to polling when it isn't (e.g. on Vercel).
+export const useDealSocket = (
+  dealId: number | undefined,
+  onEvent: (event: DealSocketEvent) => void
+) => {
+  const [connected, setConnected] = useState(false)
+  const handlerRef = useRef(onEvent)
+  handlerRef.current = onEvent
+
+  useEffect(() => {
+    if (!dealId) return
+
+    const token = localStorage.getItem('token')
+    if (!token) return
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+    // Browsers can't send an Authorization header here; the token rides as a subprotocol
+    const ws = new WebSocket(`${protocol}//${window.location.host}/api/deals/${dealId}/ws`, ['bearer', token])
+    let heartbeat: number | null = null
+
+    ws.onopen = () => {
+      setConnected(true)
+      heartbeat = window.setInterval(() => {
+        if (ws.readyState === WebSocket.OPEN) {
+          ws.send(JSON.stringify({ type: 'heartbeat', timestamp: Date.now() }))
+        }
+      }, 30000)
+    }
+
+    ws.onmessage = (event) => {
+      try {
+        handlerRef.current(JSON.parse(event.data))
+      } catch (error) {
+        console.error('Error parsing deal socket message:', error)
+      }
+    }
+
+    ws.onclose = () => {
+      setConnected(false)
+      if (heartbeat) {
+        clearInterval(heartbeat)
+      }
+    }
+
+    return () => {
+      if (heartbeat) {
+        clearInterval(heartbeat)
+      }
+      ws.close()
+    }
+  }, [dealId])
+
+  return connected
+}
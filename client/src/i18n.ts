@@ -67,6 +67,7 @@ const resources = {
       add: 'Add',
       search: 'Search',
       loading: 'Loading...',
+      load_more: 'Load more',
       error: 'Error',
       success: 'Success',
     },
@@ -136,6 +137,7 @@ const resources = {
       add: 'Добавить',
       search: 'Поиск',
       loading: 'Загрузка...',
+      load_more: 'Показать ещё',
       error: 'Ошибка',
       success: 'Успешно',
     },
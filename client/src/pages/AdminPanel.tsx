@@ -1,6 +1,8 @@
 import { useEffect, useState } from 'react'
 import { useTranslation } from 'react-i18next'
-import api from '../services/api'
+import api, { Page } from '../services/api'
+import { usePaged } from '../hooks/usePaged'
+import LoadMore from '../components/LoadMore'
 import { Users, Package, TrendingUp, Ban, ShieldCheck, Plus, Edit, Trash2 } from 'lucide-react'
 
 interface User {
@@ -31,8 +33,12 @@ const AdminPanel = () => {
   const { t, i18n } = useTranslation()
   const [activeTab, setActiveTab] = useState<'stats' | 'users' | 'products'>('stats')
   const [stats, setStats] = useState<Stats | null>(null)
-  const [users, setUsers] = useState<User[]>([])
-  const [products, setProducts] = useState<Product[]>([])
+  const {
+    items: users, loadingMore: loadingMoreUsers, hasMore: moreUsers, loadMore: loadMoreUsers, reload: loadUsers
+  } = usePaged(async (cursor) => (await api.get<Page<User>>('/admin/users', { params: { cursor } })).data)
+  const {
+    items: products, loadingMore: loadingMoreProducts, hasMore: moreProducts, loadMore: loadMoreProducts, reload: loadProducts
+  } = usePaged(async (cursor) => (await api.get<Page<Product>>('/products', { params: { cursor } })).data)
   const [showProductForm, setShowProductForm] = useState(false)
   const [editingProduct, setEditingProduct] = useState<Product | null>(null)
   const [uploading, setUploading] = useState(false)
@@ -47,8 +53,6 @@ const AdminPanel = () => {
 
   useEffect(() => {
     loadStats()
-    loadUsers()
-    loadProducts()
   }, [])
 
   const loadStats = async () => {
@@ -60,24 +64,6 @@ const AdminPanel = () => {
     }
   }
 
-  const loadUsers = async () => {
-    try {
-      const { data } = await api.get<User[]>('/admin/users')
-      setUsers(data)
-    } catch (error) {
-      console.error('Failed to load users:', error)
-    }
-  }
-
-  const loadProducts = async () => {
-    try {
-      const { data } = await api.get<Product[]>('/products')
-      setProducts(data)
-    } catch (error) {
-      console.error('Failed to load products:', error)
-    }
-  }
-
   const handleBanUser = async (userId: number, ban: boolean) => {
     try {
       await api.put(`/admin/users/${userId}/${ban ? 'ban' : 'unban'}`)
@@ -377,6 +363,7 @@ const AdminPanel = () => {
               </tbody>
             </table>
           </div>
+          <LoadMore hasMore={moreProducts} loading={loadingMoreProducts} onClick={loadMoreProducts} />
         </div>
       )}
 
@@ -419,6 +406,7 @@ const AdminPanel = () => {
               ))}
             </tbody>
           </table>
+          <LoadMore hasMore={moreUsers} loading={loadingMoreUsers} onClick={loadMoreUsers} />
         </div>
       )}
     </div>
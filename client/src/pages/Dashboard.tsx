@@ -26,7 +26,7 @@ const Dashboard = () => {
   const loadDeals = async () => {
     try {
       const data = await dealService.getDeals()
-      setDeals(data.slice(0, 5)) // Show only last 5 deals
+      setDeals(data.items.slice(0, 5)) // Show only last 5 deals
     } catch (error) {
       console.error('Failed to load deals:', error)
     } finally {
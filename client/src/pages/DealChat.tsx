@@ -3,6 +3,8 @@ import { useParams, useNavigate } from 'react-router-dom'
 import { useTranslation } from 'react-i18next'
 import { dealService, Deal, DealMessage } from '../services/deals'
 import { useAuthStore } from '../store/authStore'
+import { useDealSocket } from '../hooks/useWebSocket'
+import { productImage } from '../services/products'
 import { ArrowLeft, Send, CheckCircle, XCircle, Package, User, ShoppingBag, AlertCircle } from 'lucide-react'
 
 const DealChat = () => {
@@ -19,15 +21,61 @@ const DealChat = () => {
   const [seller, setSeller] = useState<any>(null)
   const [buyer, setBuyer] = useState<any>(null)
 
+  const live = useDealSocket(id ? parseInt(id) : undefined, (event) => {
+    if (event.type === 'new_message' && event.message) {
+      appendMessages([event.message])
+    } else if (event.type === 'deal_update') {
+      loadDeal()
+    }
+  })
+
   useEffect(() => {
     if (id) {
       loadDeal()
-      loadMessages()
-      const interval = setInterval(loadMessages, 5000) // Poll every 5 seconds
-      return () => clearInterval(interval)
     }
   }, [id])
 
+  useEffect(() => {
+    if (!id) return
+    // Reload once per (re)connect; without a socket, long-poll for new messages
+    let stopped = false
+    const pollNewMessages = async (sinceId?: number) => {
+      while (!stopped) {
+        try {
+          const data = await dealService.getMessages(parseInt(id), sinceId, 8)
+          if (stopped) return
+          if (data.length) {
+            sinceId = data[data.length - 1].id
+            appendMessages(data)
+          }
+        } catch (error) {
+          console.error('Failed to load messages:', error)
+          await new Promise((resolve) => setTimeout(resolve, 5000))
+        }
+      }
+    }
+    loadMessages().then((lastId) => {
+      if (!live) pollNewMessages(lastId)
+    })
+    return () => {
+      stopped = true
+    }
+  }, [id, live])
+
+  // An archived deal's history is no longer served by the messages endpoint
+  useEffect(() => {
+    if (!deal?.messages_archived_at) return
+    dealService
+      .getMessageHistory(deal.id)
+      .then((history) =>
+        setMessages((prev) => {
+          const known = new Set(history.map((m) => m.id))
+          return [...history, ...prev.filter((m) => !known.has(m.id))]
+        })
+      )
+      .catch((error) => console.error('Failed to load archived messages:', error))
+  }, [deal?.id, deal?.messages_archived_at])
+
   // Removed auto-scroll to prevent constant scrolling
 
   const loadDeal = async () => {
@@ -46,15 +94,25 @@ const DealChat = () => {
     }
   }
 
-  const loadMessages = async () => {
+  // Returns the id of the newest message, the starting point for polling
+  const loadMessages = async (): Promise<number | undefined> => {
     try {
       const data = await dealService.getMessages(parseInt(id!))
       setMessages(data)
+      return data.length ? data[data.length - 1].id : undefined
     } catch (error) {
       console.error('Failed to load messages:', error)
     }
   }
 
+  const appendMessages = (incoming: DealMessage[]) => {
+    setMessages((prev) => {
+      const known = new Set(prev.map((m) => m.id))
+      const fresh = incoming.filter((m) => !known.has(m.id))
+      return fresh.length ? [...prev, ...fresh] : prev
+    })
+  }
+
   const handleSendMessage = async (e: React.FormEvent) => {
     e.preventDefault()
     if (!newMessage.trim() || !user?.id) return
@@ -72,12 +130,20 @@ const DealChat = () => {
   }
 
   const handleUpdateStatus = async (status: string) => {
+    if (!deal) return
     try {
-      await dealService.updateDealStatus(parseInt(id!), status)
+      await dealService.updateDealStatus(deal, status)
       loadDeal()
       loadMessages()
-    } catch (error) {
+    } catch (error: any) {
       console.error('Failed to update status:', error)
+      if (error?.response?.status === 409) {
+        // Someone else changed the deal first; show its current state
+        loadDeal()
+        loadMessages()
+        alert(i18n.language === 'ru' ? 'Сделка уже была изменена' : 'The deal was already changed')
+        return
+      }
       alert(`${i18n.language === 'ru' ? 'Ошибка обновления статуса' : 'Failed to update status'}`)
     }
   }
@@ -150,7 +216,7 @@ const DealChat = () => {
         {deal.product && (
           <div className="flex items-center gap-4 p-6 bg-gradient-to-r from-gray-50 to-gray-100 rounded-xl border border-gray-200">
             {deal.product.image_url ? (
-              <img src={deal.product.image_url} alt={deal.product.title} className="w-24 h-24 object-cover rounded-lg" />
+              <img src={productImage(deal.product, 'thumbnail')} alt={deal.product.title} className="w-24 h-24 object-cover rounded-lg" />
             ) : (
               <div className="w-24 h-24 bg-gray-200 rounded-lg flex items-center justify-center">
                 <Package size={32} className="text-gray-400" />
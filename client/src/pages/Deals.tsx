@@ -1,32 +1,17 @@
-import { useEffect, useState } from 'react'
+import { useState } from 'react'
 import { Link } from 'react-router-dom'
 import { useTranslation } from 'react-i18next'
-import { dealService, Deal } from '../services/deals'
+import { dealService } from '../services/deals'
+import { usePaged } from '../hooks/usePaged'
+import LoadMore from '../components/LoadMore'
 import { formatDate } from '../lib/utils'
 import { MessageSquare, Clock, CheckCircle, XCircle } from 'lucide-react'
 
 const Deals = () => {
   const { t, i18n } = useTranslation()
-  const [deals, setDeals] = useState<Deal[]>([])
-  const [loading, setLoading] = useState(true)
+  const { items: deals, loading, loadingMore, hasMore, loadMore } = usePaged(dealService.getDeals)
   const [filter, setFilter] = useState<string>('all')
 
-  useEffect(() => {
-    loadDeals()
-  }, [])
-
-  const loadDeals = async () => {
-    try {
-      const data = await dealService.getDeals()
-      // Show all deals for now - filtering can be added later if needed
-      setDeals(data)
-    } catch (error) {
-      console.error('Failed to load deals:', error)
-    } finally {
-      setLoading(false)
-    }
-  }
-
   const getStatusColor = (status: string) => {
     const colors: Record<string, string> = {
       pending: 'bg-yellow-100 text-yellow-800 border-yellow-300',
@@ -145,12 +130,17 @@ const Deals = () => {
                 <span className="text-sm text-gray-600">
                   {i18n.language === 'ru' ? 'Открыть чат' : 'Open chat'}
                 </span>
-                <MessageSquare size={20} className="text-primary-600" />
+                <span className="flex items-center gap-1 text-sm text-primary-600">
+                  {deal.message_count ? deal.message_count : null}
+                  <MessageSquare size={20} />
+                </span>
               </div>
             </Link>
           ))}
         </div>
       )}
+      {/* Filters apply to the loaded deals; more may match further down */}
+      <LoadMore hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
     </div>
   )
 }
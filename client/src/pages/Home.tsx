@@ -1,7 +1,7 @@
 import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
 import { useTranslation } from 'react-i18next'
-import { productService, Product } from '../services/products'
+import { productService, Product, productImage } from '../services/products'
 import { 
   Package, 
   ArrowRight, 
@@ -27,7 +27,7 @@ const Home = () => {
   const loadProducts = async () => {
     try {
       const data = await productService.getProducts()
-      setProducts(data)
+      setProducts(data.items)
     } catch (error) {
       console.error('Failed to load products:', error)
     } finally {
@@ -129,7 +129,7 @@ const Home = () => {
                 {product.image_url && (
                   <div className="aspect-video overflow-hidden bg-gray-100 relative">
                     <img
-                      src={product.image_url}
+                      src={productImage(product, 'card')}
                       alt={product.title}
                       className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-500"
                     />
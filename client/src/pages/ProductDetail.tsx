@@ -1,7 +1,7 @@
 import { useEffect, useState } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useTranslation } from 'react-i18next'
-import { productService, Product } from '../services/products'
+import { productService, Product, productImage } from '../services/products'
 import { dealService } from '../services/deals'
 import { useAuthStore } from '../store/authStore'
 import { ShoppingCart, ArrowLeft, Package } from 'lucide-react'
@@ -84,7 +84,7 @@ const ProductDetail = () => {
         <div>
           {product.image_url ? (
             <img
-              src={product.image_url}
+              src={productImage(product, 'full')}
               alt={product.title}
               className="w-full rounded-2xl shadow-lg"
             />
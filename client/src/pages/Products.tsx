@@ -1,29 +1,15 @@
-import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
 import { useTranslation } from 'react-i18next'
-import { productService, Product } from '../services/products'
+import { productService, productImage } from '../services/products'
+import { usePaged } from '../hooks/usePaged'
+import LoadMore from '../components/LoadMore'
 import { ShoppingCart } from 'lucide-react'
 
 const Products = () => {
   const { t, i18n } = useTranslation()
-  const [products, setProducts] = useState<Product[]>([])
-  const [loading, setLoading] = useState(true)
-
-  useEffect(() => {
-    loadData()
-  }, [])
-
-  const loadData = async () => {
-    setLoading(true)
-    try {
-      const productsData = await productService.getProducts()
-      setProducts(productsData)
-    } catch (error) {
-      console.error('Failed to load data:', error)
-    } finally {
-      setLoading(false)
-    }
-  }
+  const {
+    items: products, loading, loadingMore, hasMore, loadMore
+  } = usePaged((cursor) => productService.getProducts(undefined, undefined, cursor))
 
   return (
     <div className="container mx-auto px-4 py-8 md:py-12">
@@ -81,7 +67,7 @@ const Products = () => {
                   {product.image_url && (
                     <div className="aspect-video overflow-hidden bg-gray-100 relative">
                       <img
-                        src={product.image_url}
+                        src={productImage(product, 'card')}
                         alt={product.title}
                         className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-500"
                       />
@@ -112,6 +98,7 @@ const Products = () => {
               ))}
             </div>
           )}
+          <LoadMore hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
         </div>
       </div>
     </div>
@@ -28,4 +28,10 @@ api.interceptors.response.use(
   }
 )
 
+// Keyset-paginated list response
+export interface Page<T> {
+  items: T[]
+  next_cursor: string | null
+}
+
 export default api
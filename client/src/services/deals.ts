@@ -1,4 +1,4 @@
-import api from './api'
+import api, { Page } from './api'
 
 export interface Deal {
   id: number
@@ -9,6 +9,11 @@ export interface Deal {
   created_at: string
   updated_at: string
   completed_at?: string
+  version?: number
+  message_count?: number
+  last_message_at?: string | null
+  // Set once the chat history has moved to the archive (see getMessageHistory)
+  messages_archived_at?: string | null
   product?: any
   buyer?: any
 }
@@ -28,8 +33,8 @@ export const dealService = {
     return data
   },
 
-  async getDeals(): Promise<Deal[]> {
-    const { data } = await api.get<Deal[]>('/deals')
+  async getDeals(cursor?: string): Promise<Page<Deal>> {
+    const { data } = await api.get<Page<Deal>>('/deals', { params: { cursor } })
     return data
   },
 
@@ -38,21 +43,46 @@ export const dealService = {
     return data
   },
 
+  // Pass the deal as last seen: the server rejects the change with 409 if
+  // someone else moved it in the meantime
   async updateDealStatus(
-    id: number,
+    deal: Deal,
     status: string,
     steamCardCode?: string
   ): Promise<Deal> {
-    const { data } = await api.put<Deal>(`/deals/${id}/status`, {
+    const { data } = await api.put<Deal>(`/deals/${deal.id}/status`, {
       status,
+      expected_status: deal.status,
+      version: deal.version,
       steam_card_code: steamCardCode,
     })
     return data
   },
 
-  async getMessages(dealId: number): Promise<DealMessage[]> {
-    const { data } = await api.get<DealMessage[]>(`/deals/${dealId}/messages`)
+  // Full history, or only messages newer than sinceId. With wait (seconds)
+  // the server holds an empty response open until a message arrives.
+  async getMessages(dealId: number, sinceId?: number, wait?: number): Promise<DealMessage[]> {
+    const messages: DealMessage[] = []
+    let cursor: string | null = null
+    do {
+      const { data } = await api.get<Page<DealMessage>>(`/deals/${dealId}/messages`, {
+        params: { cursor: cursor ?? undefined, since_id: sinceId, wait },
+      })
+      messages.push(...data.items)
+      cursor = data.next_cursor
+    } while (cursor)
+    return messages
+  },
+
+  // Complete history, archived part included, from the NDJSON export
+  async getMessageHistory(dealId: number): Promise<DealMessage[]> {
+    const { data } = await api.get<string>(`/deals/${dealId}/messages/export`, {
+      responseType: 'text',
+    })
     return data
+      .split('\n')
+      .filter((line) => line.trim())
+      .map((line) => JSON.parse(line) as DealMessage)
   },
 
   async sendMessage(dealId: number, message: string, senderId: number): Promise<DealMessage> {
@@ -1,4 +1,4 @@
-import api from './api'
+import api, { Page } from './api'
 
 export interface Product {
   id: number
@@ -8,18 +8,33 @@ export interface Product {
   category: string
   seller: string
   image_url?: string
+  image_variants?: ImageVariants | null
   created_at: string
 }
 
+export type ImageSize = 'thumbnail' | 'card' | 'full'
+
+// Resized copies generated on upload, keyed by format then size
+export interface ImageVariants {
+  webp?: Record<ImageSize, string>
+  avif?: Record<ImageSize, string>
+}
+
+// Best URL for displaying a product image at the given size
+export const productImage = (
+  product: { image_url?: string; image_variants?: ImageVariants | null },
+  size: ImageSize
+) => product.image_variants?.webp?.[size] ?? product.image_url
+
 export const productService = {
   async getCategories(): Promise<string[]> {
     const { data } = await api.get<string[]>('/categories')
     return data
   },
 
-  async getProducts(category?: string, search?: string): Promise<Product[]> {
-    const { data } = await api.get<Product[]>('/products', {
-      params: { category, search },
+  async getProducts(category?: string, search?: string, cursor?: string): Promise<Page<Product>> {
+    const { data } = await api.get<Page<Product>>('/products', {
+      params: { category, search, cursor },
     })
     return data
   },
@@ -16,6 +16,7 @@ export default defineConfig({
       '/api': {
         target: process.env.VITE_API_URL || 'http://localhost:8000',
         changeOrigin: true,
+        ws: true, // deal chat sockets live under /api/deals/{id}/ws
       },
       '/ws': {
         target: process.env.VITE_WS_URL || 'ws://localhost:8000',
@@ -0,0 +1,82 @@
+"""
+API tests against throwaway SQLite databases
+Run: pip install -r requirements-dev.txt && python -m pytest -q (from the repo root)
+"""
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
+from api import database  # noqa: E402
+from api.auth import create_access_token  # noqa: E402
+from api.models import Deal, Product, User  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def use_databases(monkeypatch, primary, replica=None):
+    """Point the lazy engines at SQLite files and create the schema in each"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{primary}")
+    if replica:
+        monkeypatch.setenv("DATABASE_REPLICA_URL", f"sqlite+aiosqlite:///{replica}")
+    else:
+        monkeypatch.delenv("DATABASE_REPLICA_URL", raising=False)
+    for name in ("_engine", "_session_maker", "_replica_engine", "_replica_session_maker"):
+        monkeypatch.setattr(database, name, None)
+
+    engines = {database.get_engine(), database.get_replica_engine()}
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(database.Base.metadata.create_all)
+    return engines
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    """A fresh primary database (no replica); yields a session on it"""
+    engines = await use_databases(monkeypatch, tmp_path / "primary.db")
+    async with database.new_session() as session:
+        yield session
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def client():
+    from api.index import app, catalogue_cache
+    catalogue_cache.invalidate()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def add_user(session, username="buyer", role="user"):
+    user = User(username=username, email=f"{username}@example.com", password="x", role=role)
+    session.add(user)
+    await session.commit()
+    return user
+
+
+async def add_deal(session, buyer, seller=None, **values):
+    """A deal by buyer on a new product, sold by seller if given"""
+    product = Product(
+        title="p", description="d", price=1, category="Cars",
+        seller=seller.username if seller else "s", seller_id=seller.id if seller else None,
+    )
+    session.add(product)
+    await session.flush()
+    deal = Deal(buyer_id=buyer.id, product_id=product.id, **values)
+    session.add(deal)
+    await session.commit()
+    return deal
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {create_access_token(user)}"}
@@ -0,0 +1,31 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from api.archive import archive_batch
+from api.models import Deal, Message, MessageArchive
+from conftest import add_deal, add_user, auth
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_archived_chat_leaves_messages_and_exports_once(db, client):
+    buyer = await add_user(db)
+    deal = await add_deal(db, buyer, status="completed")
+    url = f"/api/deals/{deal.id}/messages"
+    for i in range(5):
+        await client.post(url, json={"message": str(i)}, headers=auth(buyer))
+    deal.completed_at = datetime.now(timezone.utc) - timedelta(days=100)
+    await db.commit()
+
+    assert await archive_batch(db, older_than_days=90) == (1, 5)
+
+    assert await db.scalar(select(func.count()).select_from(Message)) == 0
+    assert await db.scalar(select(MessageArchive.message_count)) == 5
+    assert await db.scalar(select(Deal.messages_archived_at)) is not None
+
+    export = await client.get(f"{url}/export", headers=auth(buyer))
+    assert export.status_code == 200
+    assert [json.loads(line)["message"] for line in export.text.splitlines()] == ["0", "1", "2", "3", "4"]
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_auth(**env):
+    base = {key: value for key, value in os.environ.items() if key not in ("JWT_SECRET", "VERCEL", "ENVIRONMENT")}
+    return subprocess.run([sys.executable, "-c", "import api.auth"], cwd=ROOT, env={**base, **env}, capture_output=True, text=True)
+
+
+@pytest.mark.parametrize("env", [{"VERCEL": "1"}, {"ENVIRONMENT": "production"}])
+def test_missing_secret_is_fatal_in_production(env):
+    result = import_auth(**env)
+    assert result.returncode != 0
+    assert "JWT_SECRET environment variable is not set" in result.stderr
+
+
+def test_missing_secret_falls_back_locally():
+    assert import_auth().returncode == 0
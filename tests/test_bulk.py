@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import select
+
+from api.models import Product
+from conftest import add_user, auth
+
+pytestmark = pytest.mark.anyio
+
+VALID = b'{"title": "ok", "description": "d", "price": 1, "category": "Cars", "seller": "s"}\n'
+
+
+async def upload(client, admin, body, format):
+    return await client.post("/api/products/import", params={"format": format}, content=body, headers=auth(admin))
+
+
+async def test_ndjson_lines_that_are_not_objects_or_utf8_are_reported(db, client):
+    admin = await add_user(db, "admin", role="admin")
+    body = VALID + b"[1, 2]\n" + b'"x"\n' + b"3\n" + b'{"title": "\xff"}\n' + VALID
+
+    response = await upload(client, admin, body, "ndjson")
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (2, 4)
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4, 5]
+    assert "UTF-8" in report["errors"][-1]["error"]
+
+
+async def test_csv_rows_with_invalid_utf8_are_reported(db, client):
+    admin = await add_user(db, "admin", role="admin")
+    body = b'title,description,price,category,seller\nok,d,1,Cars,s\nbad\xff,"two\nlines",1,Cars,s\nok2,d,1,Cars,s\n'
+
+    response = await upload(client, admin, body, "csv")
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["line"] == 3
+    assert (await db.execute(select(Product.title).order_by(Product.id))).scalars().all() == ["ok", "ok2"]
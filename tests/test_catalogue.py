@@ -0,0 +1,19 @@
+import pytest
+
+from api import ratelimit
+from api.models import Product
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cache_hits_need_no_db_slot(db, client, monkeypatch):
+    db.add(Product(title="p", description="d", price=1, category="Cars", seller="s"))
+    await db.commit()
+    assert (await client.get("/api/products")).status_code == 200
+    assert (await client.get("/api/products/1")).status_code == 200
+
+    # Database saturated: every slot request times out
+    monkeypatch.setattr(ratelimit, "db_admission", ratelimit.ConcurrencyLimiter(limit=0, queue_timeout=0.01))
+    assert (await client.get("/api/products")).status_code == 200
+    assert (await client.get("/api/products/1")).status_code == 200
+    assert (await client.get("/api/products", params={"category": "Audio"})).status_code == 503
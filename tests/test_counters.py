@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import literal_column, select, update
+
+from api.counters import rebuild_counters
+from api.models import Deal
+from conftest import add_deal, add_user, auth
+
+pytestmark = pytest.mark.anyio
+
+LAST_WEEK = literal_column("'2026-01-01 12:00:00'")
+
+
+async def test_counters_leave_deal_updated_at_alone(db, client):
+    buyer = await add_user(db)
+    deal = await add_deal(db, buyer)
+    await db.execute(update(Deal).values(updated_at=LAST_WEEK))
+    await db.commit()
+
+    await client.post(f"/api/deals/{deal.id}/messages", json={"message": "hi"}, headers=auth(buyer))
+    await rebuild_counters(db)
+    await db.commit()
+
+    row = (await db.execute(select(Deal.message_count, Deal.updated_at).where(Deal.id == deal.id))).one()
+    assert row.message_count == 1
+    assert row.updated_at.isoformat(" ") == "2026-01-01 12:00:00"
@@ -0,0 +1,31 @@
+import io
+
+import pytest
+from PIL import Image
+
+from api import images
+
+
+def png(size, color=(200, 30, 30)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+def sizes(rendered):
+    return {name: Image.open(io.BytesIO(data)).size for name, data in rendered["webp"].items()}
+
+
+def test_variants_scale_down_into_their_boxes():
+    assert sizes(images._render_variants(png((3200, 1600)))) == {
+        "full": (1600, 800),
+        "card": (480, 240),
+        "thumbnail": (160, 80),
+    }
+
+
+def test_images_over_the_pixel_limit_are_refused_before_decoding(monkeypatch):
+    data = png((400, 300))
+    monkeypatch.setattr(images, "MAX_IMAGE_PIXELS", 400 * 300 - 1)
+    with pytest.raises(ValueError, match="pixel limit"):
+        images._render_variants(data)
@@ -0,0 +1,75 @@
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from api.index import app
+from conftest import add_deal, add_user, auth
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_full_page_etag_changes_when_a_next_page_appears(db, client):
+    buyer = await add_user(db)
+    deal = await add_deal(db, buyer)
+    url = f"/api/deals/{deal.id}/messages"
+    for text in ("one", "two"):
+        await client.post(url, json={"message": text}, headers=auth(buyer))
+
+    first = await client.get(url, params={"limit": 2}, headers=auth(buyer))
+    assert first.json()["next_cursor"] is None
+    await client.post(url, json={"message": "three"}, headers=auth(buyer))
+
+    again = await client.get(url, params={"limit": 2}, headers={**auth(buyer), "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 200
+    assert again.json()["next_cursor"] is not None
+
+
+async def test_chat_is_readable_only_by_the_deal_parties(db, client):
+    buyer = await add_user(db)
+    seller = await add_user(db, "seller")
+    outsider = await add_user(db, "outsider")
+    admin = await add_user(db, "admin", role="admin")
+    deal = await add_deal(db, buyer, seller)
+    url = f"/api/deals/{deal.id}/messages"
+    await client.post(url, json={"message": "code: XXXX-YYYY"}, headers=auth(seller))
+
+    assert (await client.get(url)).status_code == 401
+    assert (await client.get(url, headers=auth(outsider))).status_code == 403
+    assert (await client.get(f"/api/deals/{deal.id + 1}/messages", headers=auth(buyer))).status_code == 404
+    for user in (buyer, seller, admin):
+        response = await client.get(url, headers=auth(user))
+        assert response.status_code == 200
+        assert response.json()["items"][0]["message"] == "code: XXXX-YYYY"
+
+
+async def test_only_the_deal_parties_can_post(db, client):
+    buyer = await add_user(db)
+    seller = await add_user(db, "seller")
+    outsider = await add_user(db, "outsider")
+    deal = await add_deal(db, buyer, seller)
+    url = f"/api/deals/{deal.id}/messages"
+
+    injected = await client.post(url, json={"message": "Steam card code: FAKE"}, headers=auth(outsider))
+    assert injected.status_code == 403
+    assert (await client.post(url, json={"message": "hi"}, headers=auth(seller))).status_code == 200
+    assert [m["message"] for m in (await client.get(url, headers=auth(buyer))).json()["items"]] == ["hi"]
+
+
+async def test_socket_requires_a_party_token(db):
+    buyer = await add_user(db)
+    outsider = await add_user(db, "outsider")
+    deal = await add_deal(db, buyer)
+    url = f"/api/deals/{deal.id}/ws"
+
+    def close_code(subprotocols):
+        with TestClient(app) as client:
+            try:
+                with client.websocket_connect(url, subprotocols=subprotocols) as socket:
+                    return socket.accepted_subprotocol
+            except WebSocketDisconnect as exc:
+                return exc.code
+
+    assert close_code([]) == 4401
+    assert close_code(["bearer", "not-a-token"]) == 4401
+    assert close_code(["bearer", auth(outsider)["Authorization"].split()[1]]) == 4403
+    assert close_code(["bearer", auth(buyer)["Authorization"].split()[1]]) == "bearer"
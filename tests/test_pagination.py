@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import insert, literal_column
+
+from api.models import Message, Product
+from conftest import add_deal, add_user, auth
+
+pytestmark = pytest.mark.anyio
+
+# Stored as SQLite's CURRENT_TIMESTAMP default writes it, without microseconds
+SAME_SECOND = literal_column("'2026-01-01 12:00:00'")
+
+
+async def collect(client, url, headers=None, **params):
+    ids, cursor = [], None
+    for _ in range(20):
+        response = await client.get(url, params={**params, "cursor": cursor} if cursor else params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+    pytest.fail(f"{url} kept returning cursors: {ids}")
+
+
+async def test_products_page_across_same_timestamp(db, client):
+    await db.execute(insert(Product).values([
+        {"title": f"p{i}", "description": "d", "price": 1, "category": "Cars", "seller": "s", "created_at": SAME_SECOND}
+        for i in range(5)
+    ]))
+    await db.commit()
+
+    assert await collect(client, "/api/products", limit=2) == [5, 4, 3, 2, 1]
+
+
+async def test_messages_page_across_same_timestamp(db, client):
+    buyer = await add_user(db)
+    deal = await add_deal(db, buyer, created_at=SAME_SECOND)
+    await db.execute(insert(Message).values([
+        {"deal_id": deal.id, "sender_id": buyer.id, "message": str(i), "created_at": SAME_SECOND}
+        for i in range(5)
+    ]))
+    await db.commit()
+
+    assert await collect(client, f"/api/deals/{deal.id}/messages", auth(buyer), limit=2) == [1, 2, 3, 4, 5]
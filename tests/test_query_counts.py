@@ -0,0 +1,25 @@
+import re
+
+import pytest
+
+from conftest import add_deal, add_user
+
+pytestmark = pytest.mark.anyio
+
+
+def statements(response) -> int:
+    """SQL statement count reported by MetricsMiddleware (see metrics.py)"""
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+async def test_deals_list_runs_one_statement_whatever_the_page_size(db, client):
+    buyer = await add_user(db)
+    await add_deal(db, buyer)
+    one = await client.get("/api/deals")
+    for _ in range(30):
+        await add_deal(db, buyer)
+    many = await client.get("/api/deals")
+
+    assert len(many.json()["items"]) == 31
+    assert all(deal["product"] for deal in many.json()["items"])
+    assert statements(one) == statements(many) == 1
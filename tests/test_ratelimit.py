@@ -0,0 +1,39 @@
+import pytest
+
+from api import database
+from api.ratelimit import admission_limit
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_spoofed_forwarded_for_does_not_reset_the_register_limit(db, client):
+    statuses = []
+    for i in range(7):
+        response = await client.post(
+            "/api/auth/register",
+            json={"username": f"user{i}", "email": f"user{i}@example.com", "password": "password123"},
+            # The client-supplied hop varies; the proxy-appended one doesn't
+            headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.7"}
+        )
+        statuses.append(response.status_code)
+
+    assert statuses[:5] == [200] * 5
+    assert statuses[5:] == [429, 429]
+
+
+@pytest.mark.parametrize("mode, configured, expected", [
+    ("pooled", None, 10),
+    ("pooled", "6", 6),
+    ("pooled", "50", 10),
+    ("serverless", None, 20),
+    ("serverless", "50", 50),
+])
+def test_admission_limit_stays_within_the_pool(monkeypatch, mode, configured, expected):
+    monkeypatch.setattr(database, "DB_POOL_MODE", mode)
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 5)
+    if configured is None:
+        monkeypatch.delenv("DB_MAX_CONCURRENCY", raising=False)
+    else:
+        monkeypatch.setenv("DB_MAX_CONCURRENCY", configured)
+    assert admission_limit() == expected
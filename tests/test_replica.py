@@ -0,0 +1,43 @@
+import httpx
+import pytest
+
+from api import database
+from api.database import STICKY_COOKIE
+from api.index import app
+from api.models import Product
+from conftest import add_user, auth, use_databases
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def databases(tmp_path, monkeypatch):
+    """Separate primary and replica files; nothing replicates between them"""
+    engines = await use_databases(monkeypatch, tmp_path / "primary.db", tmp_path / "replica.db")
+    yield
+    for engine in engines:
+        await engine.dispose()
+
+
+async def test_reads_go_to_the_replica_unless_the_client_just_wrote(databases, client):
+    async with database.new_session() as primary:
+        buyer = await add_user(primary)
+        product = Product(title="p", description="d", price=1, category="Cars", seller="s")
+        primary.add(product)
+        await primary.commit()
+
+    created = await client.post("/api/deals", json={"product_id": product.id}, headers=auth(buyer))
+    assert created.status_code == 200
+    assert STICKY_COOKIE in created.cookies
+    url = f"/api/deals/{created.json()['id']}"
+
+    # The sticky cookie sends this client's reads to the primary, which has the deal
+    assert (await client.get(url)).status_code == 200
+
+    # Any other client reads the replica, which hasn't seen it
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as other:
+        assert (await other.get(url)).status_code == 404
+
+    # Nor does this one once the cookie is gone
+    client.cookies.clear()
+    assert (await client.get(url)).status_code == 404
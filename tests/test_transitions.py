@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from api.models import OutboxEvent
+from api.outbox import prune_processed
+from api.realtime import deal_hub
+from conftest import add_deal, add_user, auth
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def deal(db):
+    buyer = await add_user(db, "buyer")
+    seller = await add_user(db, "seller", role="seller")
+    deal = await add_deal(db, buyer, seller, status="accepted")
+    return deal, buyer, seller
+
+
+async def move(client, deal, user, status, **body):
+    return await client.put(f"/api/deals/{deal.id}/status", json={"status": status, **body}, headers=auth(user))
+
+
+async def test_only_the_seller_completes(db, client, deal):
+    deal, buyer, seller = deal
+    outsider = await add_user(db, "outsider")
+
+    assert (await move(client, deal, buyer, "completed")).status_code == 403
+    assert (await move(client, deal, outsider, "completed")).status_code == 403
+    response = await move(client, deal, seller, "completed")
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+async def test_only_the_buyer_marks_payment_sent(client, deal):
+    deal, buyer, seller = deal
+
+    assert (await move(client, deal, seller, "payment_sent")).status_code == 403
+    assert (await move(client, deal, buyer, "payment_sent")).status_code == 200
+
+
+async def test_stale_expected_status_reports_the_actual_one(client, deal):
+    deal, buyer, seller = deal
+
+    response = await move(client, deal, seller, "accepted", expected_status="pending")
+    assert response.status_code == 409
+    assert response.json()["detail"].startswith("Deal is accepted")
+
+
+async def test_steam_card_code_reaches_the_chat_with_the_transition(db, client, deal):
+    deal, buyer, seller = deal
+    queue = deal_hub.subscribe(deal.id)
+    try:
+        response = await move(client, deal, buyer, "payment_sent", steam_card_code="AAAA-BBBB")
+        assert response.status_code == 200
+        pushed = [queue.get_nowait() for _ in range(queue.qsize())]
+    finally:
+        deal_hub.unsubscribe(deal.id, queue)
+
+    chat = (await client.get(f"/api/deals/{deal.id}/messages", headers=auth(seller))).json()["items"]
+    assert chat[-1]["message"] == "Steam card code: AAAA-BBBB"
+    assert chat[-1]["id"] in [event["message"]["id"] for event in pushed if event["type"] == "new_message"]
+    payloads = (await db.execute(select(OutboxEvent.payload))).scalars().all()
+    assert payloads and all("AAAA-BBBB" not in str(payload) for payload in payloads)
+
+
+async def test_processed_outbox_events_are_pruned(db):
+    now = datetime.now(timezone.utc)
+    db.add_all([
+        OutboxEvent(topic="notify", payload={}, processed_at=now - timedelta(days=30)),
+        OutboxEvent(topic="notify", payload={}, processed_at=now),
+        OutboxEvent(topic="notify", payload={}),
+    ])
+    await db.commit()
+
+    assert await prune_processed(db, retention_days=7) == 1
+    assert len((await db.execute(select(OutboxEvent.id))).all()) == 2
@@ -0,0 +1,44 @@
+import pytest
+
+from api.uploads import MAX_UPLOAD_BYTES, MULTIPART_OVERHEAD
+from conftest import add_user, auth
+
+pytestmark = pytest.mark.anyio
+
+BOUNDARY = "testboundary"
+
+
+def multipart(size: int) -> bytes:
+    return (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="big.png"\r\n'
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode() + b"\0" * size + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def test_declared_length_over_limit_is_refused_before_parsing(db, client):
+    user = await add_user(db)
+    body = multipart(MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD)
+    response = await client.post(
+        "/api/upload/image", content=body,
+        headers={**auth(user), "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+    assert response.status_code == 413
+
+
+async def test_chunked_body_is_cut_off_at_the_limit(db, client):
+    user = await add_user(db)
+    sent = 0
+
+    async def chunks():
+        nonlocal sent
+        body = multipart(MAX_UPLOAD_BYTES * 4)
+        for start in range(0, len(body), 64 * 1024):
+            sent += 64 * 1024
+            yield body[start:start + 64 * 1024]
+
+    response = await client.post(
+        "/api/upload/image", content=chunks(),
+        headers={**auth(user), "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+    assert response.status_code == 413
+    assert sent < MAX_UPLOAD_BYTES * 2  # stopped reading, not buffered to the end